@@ -23,6 +23,8 @@ QDRANT_API_KEY = get_config_value("QDRANT_API_KEY", None)
 QDRANT_COLLECTION_NAME = get_config_value("QDRANT_COLLECTION_NAME", "notebooklm_prod")
 RERANKER_MAX_TOKENS = int(get_config_value("RERANKER_MAX_TOKENS", "8192"))
 RERANK_CLIENT_MAX_CONCURRENCY = int(get_config_value("RERANK_CLIENT_MAX_CONCURRENCY", 4))
+# 问题拆解/复杂度判断等辅助 LLM 请求的最大并发数
+LLM_MAX_CONCURRENCY = int(get_config_value("LLM_MAX_CONCURRENCY", 32))
 
 EMBEDDING_MAX_CONCURRENCY = int(get_config_value("EMBEDDING_MAX_CONCURRENCY", 4))
 EMBEDDING_BATCH_SIZE = int(get_config_value("EMBEDDING_BATCH_SIZE", 4))
@@ -34,6 +36,11 @@ WEBHOOK_PREFIX = get_config_value("WEBHOOK_PREFIX", "http://192.168.31.125:5678/
 DEFAULT_TOOL_MODE = get_config_value("DEFAULT_TOOL_MODE", "auto")
 MAX_TOOL_STEPS = int(get_config_value("MAX_TOOL_STEPS", "8"))
 
+# 工具结果缓存配置（编排器级别，按 工具名+规范化参数 复用结果）
+TOOL_RESULT_CACHE_ENABLED = get_config_value("TOOL_RESULT_CACHE_ENABLED", "true").lower() == "true"
+TOOL_RESULT_CACHE_MAX_SIZE = int(get_config_value("TOOL_RESULT_CACHE_MAX_SIZE", "1024"))
+TOOL_RESULT_CACHE_TTL_SECONDS = float(get_config_value("TOOL_RESULT_CACHE_TTL_SECONDS", "600"))  # 10分钟
+
 # Web 搜索相关配置
 WEB_SEARCH_RESULT_COUNT = int(get_config_value("WEB_SEARCH_RESULT_COUNT", "2"))  # 每个搜索关键词的结果控制在2个
 WEB_SEARCH_MAX_QUERIES = int(get_config_value("WEB_SEARCH_MAX_QUERIES", "20"))  # 总搜索查询数量上限
@@ -57,6 +64,19 @@ SIMPLE_QUERY_MAX_WORDS_PER_QUERY = int(get_config_value("SIMPLE_QUERY_MAX_WORDS_
 # 普通问答：子问题数量上限（用于问题拆解阶段）
 NORMAL_MAX_SUB_QUERIES = int(get_config_value("NORMAL_MAX_SUB_QUERIES", "5"))
 
+# 问题拆解结果缓存：相同问题/模型/聊天历史在 TTL 内直接复用拆解结果，跳过 LLM 往返
+DECOMPOSITION_CACHE_ENABLED = get_config_value("DECOMPOSITION_CACHE_ENABLED", "true").lower() == "true"
+DECOMPOSITION_CACHE_MAX_SIZE = int(get_config_value("DECOMPOSITION_CACHE_MAX_SIZE", "1024"))
+DECOMPOSITION_CACHE_TTL_SECONDS = float(get_config_value("DECOMPOSITION_CACHE_TTL_SECONDS", "1800"))  # 30分钟
+# 语义缓存：精确缓存未命中时，用 embedding 余弦相似度匹配近似问题（无聊天历史时生效）；
+# 仅替换了实体的问题（如不同城市的天气）相似度也常在 0.9 以上，阈值不宜过低
+DECOMPOSITION_SEMANTIC_CACHE_ENABLED = get_config_value("DECOMPOSITION_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+DECOMPOSITION_SEMANTIC_CACHE_THRESHOLD = float(get_config_value("DECOMPOSITION_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+# 复杂度判断与问题拆解合并为一次 LLM 调用；上下文较小的模型可关闭以回到两步模式
+DECOMPOSITION_FUSE_COMPLEXITY_JUDGE = get_config_value("DECOMPOSITION_FUSE_COMPLEXITY_JUDGE", "true").lower() == "true"
+# 问题拆解请求的最大生成 token 数（0 表示不限制）；推理模型的思考 token 也计入，不宜设得过小
+DECOMPOSITION_MAX_TOKENS = int(get_config_value("DECOMPOSITION_MAX_TOKENS", "2048"))
+
 # Web 爬取相关配置  
 WEB_LOADER_ENGINE = get_config_value("WEB_LOADER_ENGINE", "safe_web")  # safe_web, playwright
 PLAYWRIGHT_TIMEOUT = float(get_config_value("PLAYWRIGHT_TIMEOUT", "10.0"))
@@ -142,6 +162,10 @@ DEFAULT_EMBEDDING_MODEL = get_config_value("DEFAULT_EMBEDDING_MODEL", "Qwen/Qwen
 
 # 思考引擎LLM配置
 REASONING_TIMEOUT = float(get_config_value("REASONING_TIMEOUT", "3600.0"))
+# 批量思考结果缓存（按 模型 + 上下文 + 子问题列表 + 聊天历史 精确匹配）
+REASONING_CACHE_ENABLED = get_config_value("REASONING_CACHE_ENABLED", "true").lower() == "true"
+REASONING_CACHE_MAX_SIZE = int(get_config_value("REASONING_CACHE_MAX_SIZE", "512"))
+REASONING_CACHE_TTL_SECONDS = float(get_config_value("REASONING_CACHE_TTL_SECONDS", "1800"))  # 30分钟
 
 # Web搜索关键词生成LLM配置
 WEB_SEARCH_LLM_TIMEOUT = float(get_config_value("WEB_SEARCH_LLM_TIMEOUT", "1800.0"))  # 30分钟
@@ -189,6 +213,7 @@ print(f"LLM_SERVICE_URL: {LLM_SERVICE_URL}")
 print(f"RERANKER_SERVICE_URL: {RERANKER_SERVICE_URL}")
 print(f"RERANKER_MAX_TOKENS: {RERANKER_MAX_TOKENS}")
 print(f"RERANK_CLIENT_MAX_CONCURRENCY: {RERANK_CLIENT_MAX_CONCURRENCY}")
+print(f"LLM_MAX_CONCURRENCY: {LLM_MAX_CONCURRENCY}")
 
 print(f"EMBEDDING_MAX_CONCURRENCY: {EMBEDDING_MAX_CONCURRENCY}")
 print(f"EMBEDDING_BATCH_SIZE: {EMBEDDING_BATCH_SIZE}")
@@ -203,6 +228,7 @@ print(f"REDDIT_USE_API: {REDDIT_USE_API}")
 # 工具相关配置
 print(f"DEFAULT_TOOL_MODE: {DEFAULT_TOOL_MODE}")
 print(f"MAX_TOOL_STEPS: {MAX_TOOL_STEPS}")
+print(f"TOOL_RESULT_CACHE_ENABLED: {TOOL_RESULT_CACHE_ENABLED}")
 
 # Web 搜索相关配置
 print(f"WEB_SEARCH_RESULT_COUNT: {WEB_SEARCH_RESULT_COUNT}")
@@ -228,4 +254,8 @@ print(f"ENABLE_QUERY_GENERATION: {ENABLE_QUERY_GENERATION}")
 print(f"CHUNK_SIZE: {CHUNK_SIZE}")
 print(f"RAG_TOP_K: {RAG_TOP_K}")
 print(f"NORMAL_MAX_SUB_QUERIES: {NORMAL_MAX_SUB_QUERIES}")
+print(f"DECOMPOSITION_CACHE_ENABLED: {DECOMPOSITION_CACHE_ENABLED}")
+print(f"DECOMPOSITION_SEMANTIC_CACHE_ENABLED: {DECOMPOSITION_SEMANTIC_CACHE_ENABLED}")
+print(f"DECOMPOSITION_FUSE_COMPLEXITY_JUDGE: {DECOMPOSITION_FUSE_COMPLEXITY_JUDGE}")
+print(f"REASONING_CACHE_ENABLED: {REASONING_CACHE_ENABLED}")
 print("-------------------------------")
@@ -3,8 +3,9 @@ from typing import List, Optional
 import asyncio
 
 from app.config import EMBEDDING_SERVICE_URL, DEFAULT_EMBEDDING_MODEL
+from app.services.network import get_embedding_httpx_client
 
-async def _embed_batch(texts: List[str], model: str, client: httpx.AsyncClient, dimensions: Optional[int] = None) -> List[List[float]]:
+async def _embed_batch(texts: List[str], model: str, client: httpx.AsyncClient, dimensions: Optional[int] = None, timeout=httpx.USE_CLIENT_DEFAULT) -> List[List[float]]:
     """帮助函数，用于嵌入单批次的文本。"""
     url = f"{EMBEDDING_SERVICE_URL}/embeddings"
     payload = {
@@ -15,7 +16,7 @@ async def _embed_batch(texts: List[str], model: str, client: httpx.AsyncClient,
     if dimensions:
         payload["dimensions"] = dimensions
         
-    response = await client.post(url, json=payload)
+    response = await client.post(url, json=payload, timeout=timeout)
     response.raise_for_status()
     data = response.json()
     # OpenAI API 保证输出顺序与输入顺序一致
@@ -44,3 +45,10 @@ async def embed_texts(texts: List[str], model: str = DEFAULT_EMBEDDING_MODEL, ba
                 continue
 
     return all_embeddings
+
+async def embed_query(text: str, model: str = DEFAULT_EMBEDDING_MODEL, timeout: float = 30) -> List[float]:
+    """
+    嵌入单条查询文本，用于语义缓存等低延迟场景（不分批、不休眠，复用共享连接）。
+    """
+    embeddings = await _embed_batch([text], model, get_embedding_httpx_client(), timeout=timeout)
+    return embeddings[0]
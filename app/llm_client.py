@@ -1,4 +1,3 @@
-import httpx
 import json
 from typing import AsyncGenerator, List, Dict, Any, Optional
 from app.config import (
@@ -10,6 +9,20 @@ from .tools.models import RunConfig, ToolMode
 from .tools.orchestrator import get_orchestrator
 from .tools.selector import StrategySelector
 from .tools.intelligent_orchestrator import IntelligentOrchestrator
+from .services.network import get_llm_httpx_client
+
+# LLM 请求/响应的 JSON 编解码：优先 orjson（其 JSONDecodeError 继承自 json.JSONDecodeError），
+# 未安装时回退到标准库
+try:
+    from orjson import loads as _json_loads, dumps as _json_dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# 请求体由 _json_dumps 预先序列化为 bytes，需显式声明内容类型
+_JSON_HEADERS = {"Content-Type": "application/json"}
 
 async def generate_answer(question: str, contexts: List[str], model: str = DEFAULT_SEARCH_MODEL, conversation_history: List[Dict] = None) -> str:
     """调用 LM Studio OpenAI 兼容 /v1/chat/completions 接口，根据检索到的上下文生成答案。"""
@@ -42,13 +55,13 @@ async def generate_answer(question: str, contexts: List[str], model: str = DEFAU
 
     print(len(contexts), "contexts")
 
-    async with httpx.AsyncClient(timeout=300) as client:
-        response = await client.post(url, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        # 优先使用 reasoning_content，其次 content
-        message = (data.get("choices") or [{}])[0].get("message", {})
-        return message.get("reasoning_content") or message.get("content") or ""
+    client = get_llm_httpx_client()
+    response = await client.post(url, json=payload, timeout=300)
+    response.raise_for_status()
+    data = response.json()
+    # 优先使用 reasoning_content，其次 content
+    message = (data.get("choices") or [{}])[0].get("message", {})
+    return message.get("reasoning_content") or message.get("content") or ""
 
 
 async def stream_answer(
@@ -93,35 +106,35 @@ async def stream_answer(
         "stream": True,
     }
 
-    async with httpx.AsyncClient(timeout=None) as client:
-        async with client.stream("POST", url, json=payload) as response:
-            response.raise_for_status()
-            async for line in response.aiter_lines():
-                if not line:
+    client = get_llm_httpx_client()
+    async with client.stream("POST", url, json=payload, timeout=None) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            # OpenAI 兼容：每行以 data: 开头
+            if line.startswith("data:"):
+                data_str = line[5:].strip()
+                if not data_str:
                     continue
-                # OpenAI 兼容：每行以 data: 开头
-                if line.startswith("data:"):
-                    data_str = line[5:].strip()
-                    if not data_str:
-                        continue
-                    if data_str == "[DONE]":
-                        break
-                    try:
-                        obj = json.loads(data_str)
-                        choices = obj.get("choices") or []
-                        if not choices:
-                            continue
-                        delta = choices[0].get("delta") or {}
-                        reasoning_content = delta.get("reasoning_content")
-                        content = delta.get("content")
-                        
-                        if reasoning_content:
-                            yield {"type": "reasoning", "content": reasoning_content}
-                        if content:
-                            yield {"type": "content", "content": content}
-                    except Exception:
-                        # 忽略无法解析的行
+                if data_str == "[DONE]":
+                    break
+                try:
+                    obj = json.loads(data_str)
+                    choices = obj.get("choices") or []
+                    if not choices:
                         continue
+                    delta = choices[0].get("delta") or {}
+                    reasoning_content = delta.get("reasoning_content")
+                    content = delta.get("content")
+                    
+                    if reasoning_content:
+                        yield {"type": "reasoning", "content": reasoning_content}
+                    if content:
+                        yield {"type": "content", "content": content}
+                except Exception:
+                    # 忽略无法解析的行
+                    continue
 
 
 async def generate_answer_with_tools(
@@ -279,14 +292,14 @@ async def chat_complete(
     
     timeout_value = timeout if timeout is not None else LLM_DEFAULT_TIMEOUT
     
-    async with httpx.AsyncClient(timeout=timeout_value) as client:
-        response = await client.post(url, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        
-        # 优先使用 reasoning_content，其次 content
-        message = (data.get("choices") or [{}])[0].get("message", {})
-        return message.get("reasoning_content") or message.get("content") or ""
+    client = get_llm_httpx_client()
+    response = await client.post(url, content=_json_dumps(payload), headers=_JSON_HEADERS, timeout=timeout_value)
+    response.raise_for_status()
+    data = _json_loads(response.content)
+    
+    # 优先使用 reasoning_content，其次 content
+    message = (data.get("choices") or [{}])[0].get("message", {})
+    return message.get("reasoning_content") or message.get("content") or ""
 
 
 async def chat_complete_stream(
@@ -323,28 +336,28 @@ async def chat_complete_stream(
     
     timeout_value = timeout if timeout is not None else LLM_DEFAULT_TIMEOUT
     
-    async with httpx.AsyncClient(timeout=timeout_value) as client:
-        async with client.stream("POST", url, json=payload) as response:
-            response.raise_for_status()
-            async for line in response.aiter_lines():
-                if not line:
+    client = get_llm_httpx_client()
+    async with client.stream("POST", url, content=_json_dumps(payload), headers=_JSON_HEADERS, timeout=timeout_value) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            
+            # 兼容两种SSE前缀："data:" 与 "data: "
+            if line.startswith("data:"):
+                # 去掉前缀并修剪空白
+                data_str = line[5:].strip()
+                if data_str == "[DONE]":
+                    break
+                try:
+                    chunk = _json_loads(data_str)
+                    if "choices" in chunk and len(chunk["choices"]) > 0:
+                        delta = chunk["choices"][0].get("delta", {})
+                        reasoning_content = delta.get("reasoning_content")
+                        content = delta.get("content")
+                        if reasoning_content:
+                            yield {"type": "reasoning", "content": reasoning_content}
+                        if content:
+                            yield {"type": "content", "content": content}
+                except json.JSONDecodeError:
                     continue
-                
-                # 兼容两种SSE前缀："data:" 与 "data: "
-                if line.startswith("data:"):
-                    # 去掉前缀并修剪空白
-                    data_str = line[5:].strip()
-                    if data_str == "[DONE]":
-                        break
-                    try:
-                        chunk = json.loads(data_str)
-                        if "choices" in chunk and len(chunk["choices"]) > 0:
-                            delta = chunk["choices"][0].get("delta", {})
-                            reasoning_content = delta.get("reasoning_content")
-                            content = delta.get("content")
-                            if reasoning_content:
-                                yield {"type": "reasoning", "content": reasoning_content}
-                            if content:
-                                yield {"type": "content", "content": content}
-                    except json.JSONDecodeError:
-                        continue
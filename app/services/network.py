@@ -12,6 +12,7 @@ from app.config import (
     HTTPX_HTTP2_ENABLED,
     HTTPX_MAX_KEEPALIVE_CONNECTIONS,
     HTTPX_MAX_CONNECTIONS,
+    LLM_DEFAULT_TIMEOUT,
     PLAYWRIGHT_MAX_CONCURRENCY,
     PLAYWRIGHT_HEADLESS,
     PLAYWRIGHT_PERSISTENT,
@@ -28,6 +29,8 @@ from app.config import (
 
 # 全局单例资源（由应用 lifespan 管理）
 _httpx_client: Optional[httpx.AsyncClient] = None
+_llm_httpx_client: Optional[httpx.AsyncClient] = None
+_embedding_httpx_client: Optional[httpx.AsyncClient] = None
 _playwright: Optional[Playwright] = None
 _browser: Optional[Browser] = None
 _playwright_semaphore: Optional[asyncio.Semaphore] = None
@@ -100,7 +103,7 @@ async def initialize_network_resources() -> None:
 
 async def shutdown_network_resources() -> None:
     """关闭并清理全局 httpx 客户端与 Playwright 浏览器。"""
-    global _httpx_client, _playwright, _browser, _playwright_semaphore, _persistent_context
+    global _httpx_client, _llm_httpx_client, _embedding_httpx_client, _playwright, _browser, _playwright_semaphore, _persistent_context
 
     # 关闭主要的 httpx 客户端
     if _httpx_client is not None:
@@ -111,6 +114,24 @@ async def shutdown_network_resources() -> None:
         finally:
             _httpx_client = None
 
+    # 关闭 LLM 服务客户端
+    if _llm_httpx_client is not None:
+        try:
+            await _llm_httpx_client.aclose()
+        except Exception as e:
+            print(f"Error closing LLM httpx client: {e}")
+        finally:
+            _llm_httpx_client = None
+
+    # 关闭 embedding 服务客户端
+    if _embedding_httpx_client is not None:
+        try:
+            await _embedding_httpx_client.aclose()
+        except Exception as e:
+            print(f"Error closing embedding httpx client: {e}")
+        finally:
+            _embedding_httpx_client = None
+
     # 关闭所有可能的懒加载客户端
     clients_to_close = list(_created_clients)
     for client in clients_to_close:
@@ -200,6 +221,42 @@ def get_httpx_client() -> httpx.AsyncClient:
     return _httpx_client
 
 
+def get_llm_httpx_client() -> httpx.AsyncClient:
+    """获取访问 LLM 服务的共享 httpx 客户端（惰性创建，关闭后自动重建）。
+
+    与抓取网页的客户端分开：不强制走 PROXY_URL、不伪装浏览器请求头；
+    各调用方可通过请求级 timeout 覆盖默认超时。
+    """
+    global _llm_httpx_client
+    if _llm_httpx_client is None or _llm_httpx_client.is_closed:
+        _llm_httpx_client = httpx.AsyncClient(
+            timeout=LLM_DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTPX_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=HTTPX_MAX_CONNECTIONS,
+            ),
+        )
+    return _llm_httpx_client
+
+
+def get_embedding_httpx_client() -> httpx.AsyncClient:
+    """获取访问 embedding 服务的共享 httpx 客户端（惰性创建，关闭后自动重建）。
+
+    单条查询向量化（如语义缓存查找）复用连接，避免每次请求重新建立连接；
+    调用方通过请求级 timeout 控制超时。
+    """
+    global _embedding_httpx_client
+    if _embedding_httpx_client is None or _embedding_httpx_client.is_closed:
+        _embedding_httpx_client = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTPX_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=HTTPX_MAX_CONNECTIONS,
+            ),
+        )
+    return _embedding_httpx_client
+
+
 def get_playwright_browser() -> Browser:
     if _browser is None:
         raise RuntimeError("Playwright browser is not initialized (non-persistent mode). Ensure lifespan has started.")
@@ -1,7 +1,7 @@
 """工具系统数据结构定义"""
 from typing import Any, Dict, List, Optional, Union
 from enum import Enum
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 
 class ToolMode(str, Enum):
@@ -21,6 +21,8 @@ class ToolSchema(BaseModel):
     
     class Config:
         extra = "forbid"
+        # 注册后只读：参数校验按 parameters 对象身份缓存预编译结果
+        frozen = True
 
 
 class ToolCall(BaseModel):
@@ -43,6 +45,7 @@ class ToolResult(BaseModel):
     # 可观测性字段（可选）
     latency_ms: Optional[float] = None
     retries: int = 0
+    cache_hit: bool = False  # 是否来自编排器的工具结果缓存
     
     class Config:
         extra = "forbid"
@@ -62,6 +65,27 @@ class Step(BaseModel):
     content: str
     tool_call: Optional[ToolCall] = None
     tool_result: Optional[ToolResult] = None
+    # 序列化结果缓存（在 add_step 时预先计算）
+    _dict: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为接口返回的步骤格式，首次计算后缓存"""
+        if self._dict is None:
+            self._dict = {
+                "type": self.step_type.value,
+                "content": self.content,
+                "tool_call": {
+                    "name": self.tool_call.name,
+                    "arguments": self.tool_call.arguments
+                } if self.tool_call else None,
+                "tool_result": {
+                    "name": self.tool_result.name,
+                    "result": self.tool_result.result,
+                    "success": self.tool_result.success,
+                    "cache_hit": self.tool_result.cache_hit
+                } if self.tool_result else None
+            }
+        return self._dict
     
     class Config:
         extra = "forbid"
@@ -79,6 +103,8 @@ class RunConfig(BaseModel):
     # 运行与步骤超时（秒）
     run_timeout_s: Optional[float] = None
     step_timeout_s: Optional[float] = None
+    # 流式执行时相邻步骤的最小间隔（秒），默认不限速
+    step_min_interval_s: Optional[float] = None
     
     def get_max_steps(self) -> int:
         """获取实际的最大步数，如果未设置则使用配置文件中的 MAX_TOOL_STEPS"""
@@ -104,6 +130,8 @@ class ToolMetadata(BaseModel):
     cache_enabled: bool = True
     cache_ttl: Optional[float] = None  # 如果不设置，使用默认TTL
     cache_max_size: Optional[int] = None
+    # 幂等工具：并发的相同调用（工具名 + 参数相同）合并为一次执行
+    idempotent: bool = False
     # 预留：未来可加入 rate_limit, circuit breaker 等
     
     class Config:
@@ -119,11 +147,15 @@ class ToolExecutionContext(BaseModel):
     current_step: int = 0
     conversation_history: Optional[List[Dict[str, str]]] = None
     is_simple_query: bool = False  # 是否为简单查询模式
+    has_final_answer: bool = False  # 是否已记录最终答案步骤（在 add_step 中维护）
     
     def add_step(self, step: Step):
         """添加执行步骤"""
         self.steps.append(step)
         self.current_step += 1
+        step.to_dict()
+        if step.step_type == StepType.FINAL_ANSWER:
+            self.has_final_answer = True
         
     def get_conversation_history(self) -> List[Dict[str, str]]:
         """获取对话历史，用于构建 messages"""
@@ -1,15 +1,26 @@
 """工具编排器 - Reason → Act → Observation 主循环"""
 import asyncio
-from typing import Dict, List, Any, Optional, AsyncGenerator, Union
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, AsyncGenerator, Union, Tuple
 from .models import (
     ToolMode, RunConfig, ToolExecutionContext, Step, StepType,
-    ToolSchema
+    ToolSchema, ToolCall, ToolResult
 )
 from .selector import StrategySelector
 from .registry import tool_registry, register_all_tools
 from .strategies.json_fc import JSONFunctionCallingStrategy
 from .strategies.react import ReActStrategy
 from .strategies.harmony import HarmonyStrategy
+from ..utils.async_timeout import await_until
+from ..config import (
+    TOOL_RESULT_CACHE_ENABLED,
+    TOOL_RESULT_CACHE_MAX_SIZE,
+    TOOL_RESULT_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class ToolOrchestrator:
@@ -22,6 +33,14 @@ class ToolOrchestrator:
             ToolMode.REACT: ReActStrategy(llm_service_url),
             ToolMode.HARMONY: HarmonyStrategy(llm_service_url)
         }
+        # 工具结果缓存：工具名 -> {(工具名, 规范化参数): (写入时间, 结果)}，按工具分别 LRU 淘汰，
+        # 容量与 TTL 取工具元数据中的 cache_max_size / cache_ttl，未设置时使用全局默认值
+        self._tool_cache: Dict[str, "OrderedDict[Tuple[str, str], Tuple[float, ToolResult]]"] = {}
+        self._tool_cache_max_size = TOOL_RESULT_CACHE_MAX_SIZE
+        self._tool_cache_ttl = TOOL_RESULT_CACHE_TTL_SECONDS
+        # 策略执行工具时回调编排器，以便命中缓存
+        for strategy in self.strategies.values():
+            strategy.tool_executor = self.cached_execute_tool
     
     async def close(self):
         """清理资源，关闭HTTP连接"""
@@ -31,6 +50,60 @@ class ToolOrchestrator:
             except Exception as e:
                 print(f"[Orchestrator] 清理策略资源时出错: {e}")
     
+    @staticmethod
+    def _tool_cache_key(tool_call: ToolCall, context: Optional[ToolExecutionContext] = None) -> Tuple[str, str]:
+        """生成工具结果缓存键：与注册表并发合并使用同一调用标识（工具名 + 参数 + 注入的上下文参数）"""
+        return tool_registry.call_key(tool_call, context)
+    
+    async def cached_execute_tool(
+        self,
+        tool_call: ToolCall,
+        context: Optional[ToolExecutionContext] = None
+    ) -> ToolResult:
+        """带结果缓存的工具执行
+        
+        相同工具名与参数的调用在 TTL 内直接复用上次成功结果，跳过重复的网络请求。
+        仅缓存成功结果；命中时保留本次调用的 call_id，并标记 cache_hit。
+        元数据中 cache_enabled=False 的工具（如有副作用的 web_search）不经过缓存。
+        """
+        if not TOOL_RESULT_CACHE_ENABLED:
+            return await tool_registry.execute_tool(tool_call, context)
+        meta = tool_registry.get_tool_metadata(tool_call.name)
+        if meta is None or not meta.cache_enabled:
+            return await tool_registry.execute_tool(tool_call, context)
+        max_size = meta.cache_max_size if meta.cache_max_size is not None else self._tool_cache_max_size
+        if max_size <= 0:
+            return await tool_registry.execute_tool(tool_call, context)
+        ttl = meta.cache_ttl if meta.cache_ttl is not None else self._tool_cache_ttl
+        
+        cache = self._tool_cache.get(tool_call.name)
+        if cache is None:
+            cache = self._tool_cache[tool_call.name] = OrderedDict()
+        monotonic = time.monotonic
+        key = self._tool_cache_key(tool_call, context)
+        entry = cache.get(key)
+        if entry is not None:
+            cached_at, cached = entry
+            if monotonic() - cached_at <= ttl:
+                cache.move_to_end(key)
+                logger.debug("[Orchestrator] 工具结果缓存命中: %s", tool_call.name)
+                # model_copy 不重新校验，避免对大结果（如网页搜索结果）整体重建模型
+                return cached.model_copy(update={
+                    "call_id": tool_call.call_id,
+                    "latency_ms": 0.0,
+                    "retries": 0,
+                    "cache_hit": True,
+                })
+            del cache[key]
+        
+        tool_result = await tool_registry.execute_tool(tool_call, context)
+        if tool_result.success:
+            cache[key] = (monotonic(), tool_result)
+            cache.move_to_end(key)
+            while len(cache) > max_size:
+                cache.popitem(last=False)
+        return tool_result
+    
     def _select_strategy(self, context: ToolExecutionContext):
         """选择执行策略"""
         # 确定实际使用的策略
@@ -50,14 +123,14 @@ class ToolOrchestrator:
         
         return self.strategies.get(selected_mode)
     
-    def _should_continue(self, context: ToolExecutionContext) -> bool:
+    def _should_continue(self, context: ToolExecutionContext, max_steps: int) -> bool:
         """判断是否应该继续执行"""
         # 检查最大步数限制
-        if context.current_step >= context.run_config.get_max_steps():
+        if context.current_step >= max_steps:
             return False
         
         # 检查是否已经有最终答案
-        if context.steps and context.steps[-1].step_type == StepType.FINAL_ANSWER:
+        if context.has_final_answer:
             return False
         
         # 如果没有可用工具，直接结束（让策略处理）
@@ -69,9 +142,9 @@ class ToolOrchestrator:
         
         return True
     
-    def _should_force_final_answer(self, context: ToolExecutionContext) -> bool:
+    def _should_force_final_answer(self, context: ToolExecutionContext, max_steps: int) -> bool:
         """判断是否应该强制生成最终答案（达到步数限制时）"""
-        return context.current_step >= context.run_config.get_max_steps()
+        return context.current_step >= max_steps
     
     async def execute_non_stream(
         self,
@@ -108,12 +181,15 @@ class ToolOrchestrator:
         
         # 执行主循环
         try:
+            # 循环内不变量提前取出
+            max_steps = run_config.get_max_steps()
+            loop = asyncio.get_running_loop()
             # 运行级别超时
             run_deadline = None
             if run_config.run_timeout_s and run_config.run_timeout_s > 0:
-                run_deadline = asyncio.get_event_loop().time() + run_config.run_timeout_s
-            while self._should_continue(context):
-                if run_deadline is not None and asyncio.get_event_loop().time() >= run_deadline:
+                run_deadline = loop.time() + run_config.run_timeout_s
+            while self._should_continue(context, max_steps):
+                if run_deadline is not None and loop.time() >= run_deadline:
                     break
                 if run_config.step_timeout_s and run_config.step_timeout_s > 0:
                     step = await asyncio.wait_for(strategy.execute_step(context), timeout=run_config.step_timeout_s)
@@ -131,11 +207,11 @@ class ToolOrchestrator:
             
             # 检查是否需要强制生成最终答案
             final_answer = ""
-            if context.steps and context.steps[-1].step_type == StepType.FINAL_ANSWER:
+            if context.has_final_answer:
                 final_answer = context.steps[-1].content
-            elif self._should_force_final_answer(context):
+            elif self._should_force_final_answer(context, max_steps):
                 # 达到最大步数限制，强制生成最终答案
-                print(f"[Orchestrator] 达到最大工具调用步数限制({context.run_config.get_max_steps()}步)，强制生成最终答案")
+                print(f"[Orchestrator] 达到最大工具调用步数限制({max_steps}步)，强制生成最终答案")
                 try:
                     final_step = await strategy.force_final_answer(context)
                     if final_step:
@@ -152,21 +228,7 @@ class ToolOrchestrator:
             
             return {
                 "answer": final_answer,
-                "steps": [
-                    {
-                        "type": step.step_type.value,
-                        "content": step.content,
-                        "tool_call": {
-                            "name": step.tool_call.name,
-                            "arguments": step.tool_call.arguments
-                        } if step.tool_call else None,
-                        "tool_result": {
-                            "name": step.tool_result.name,
-                            "result": step.tool_result.result,
-                            "success": step.tool_result.success
-                        } if step.tool_result else None
-                    } for step in context.steps
-                ],
+                "steps": [step.to_dict() for step in context.steps],
                 "success": True
             }
             
@@ -213,37 +275,37 @@ class ToolOrchestrator:
         try:
             step_count = 0
             max_steps = run_config.get_max_steps()
+            loop = asyncio.get_running_loop()
+            loop_time = loop.time
+            should_continue = self._should_continue
+            step_timeout_s = run_config.step_timeout_s
             
             while step_count < max_steps:
                 step_count += 1
                 
                 # 检查是否应该继续
-                if not self._should_continue(context):
+                if not should_continue(context, max_steps):
                     break
                 
                 # 流式执行步骤
                 step_executed = False
-                if run_config.step_timeout_s and run_config.step_timeout_s > 0:
-                    # 将流式输出转入内部队列，以便应用超时
-                    queue: asyncio.Queue = asyncio.Queue()
-                    async def _pump():
-                        try:
-                            async for ev in strategy.stream_execute_step(context):
-                                await queue.put(ev)
-                        finally:
-                            await queue.put({"__done__": True})
-                    task = asyncio.create_task(_pump())
+                if step_timeout_s and step_timeout_s > 0:
+                    # 整个步骤共享一个截止时间；只对拉取事件计时，yield 给调用方时不在超时作用域内
+                    step_deadline = loop_time() + step_timeout_s
+                    events = strategy.stream_execute_step(context)
+                    next_event = events.__anext__
                     try:
                         while True:
-                            event = await asyncio.wait_for(queue.get(), timeout=run_config.step_timeout_s)
-                            if event.get("__done__"):
+                            try:
+                                event = await await_until(next_event(), step_deadline)
+                            except StopAsyncIteration:
                                 break
                             step_executed = True
                             yield event
                             if event.get("type") == "final_answer":
                                 return
                     finally:
-                        task.cancel()
+                        await events.aclose()
                 else:
                     async for event in strategy.stream_execute_step(context):
                         step_executed = True
@@ -257,13 +319,14 @@ class ToolOrchestrator:
                 if not step_executed:
                     break
                 
-                # 小延迟，避免过于频繁的请求
-                await asyncio.sleep(0.1)
+                # 可选限速：仅在显式配置时插入步骤间隔
+                if run_config.step_min_interval_s and run_config.step_min_interval_s > 0:
+                    await asyncio.sleep(run_config.step_min_interval_s)
             
             # 如果达到最大步数（按循环计数或上下文累计步数），强制生成最终答案
             # 之前仅依据 step_count 判断，若策略在单轮内添加多个步骤导致 context.current_step 先到上限，
             # 会提前跳出循环且无法进入强制生成分支，导致未产生 final_answer。
-            if (step_count >= max_steps or context.current_step >= max_steps) and not (context.steps and context.steps[-1].step_type == StepType.FINAL_ANSWER):
+            if (step_count >= max_steps or context.current_step >= max_steps) and not context.has_final_answer:
                 yield {
                     "type": "info",
                     "message": f"已达到最大工具调用步数限制({max_steps}步)，正在生成最终答案..."
@@ -1,44 +1,173 @@
 """ReAct 和 Harmony 格式解析器"""
 import re
+import sys
 import json
-import xml.etree.ElementTree as ET
+import logging
+import functools
 from typing import List, Optional, Dict, Any, Union
 from .models import ToolCall
 
+try:
+    from jsonschema import Draft202012Validator
+except ImportError:  # 未安装 jsonschema 时回退到内置的简单校验
+    Draft202012Validator = None
+
+logger = logging.getLogger(__name__)
+
+# 工具参数 JSON 解码：优先 orjson（其 JSONDecodeError 继承自 json.JSONDecodeError），
+# 未安装时复用同一个标准库解码器实例
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.JSONDecoder().decode
+
+
+def _is_str(value: Any) -> bool:
+    return isinstance(value, str)
+
+
+def _is_num(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+def _is_bool(value: Any) -> bool:
+    return isinstance(value, bool)
+
+
+def _is_list(value: Any) -> bool:
+    return isinstance(value, list)
+
+
+def _is_dict(value: Any) -> bool:
+    return isinstance(value, dict)
+
+
+# JSON Schema 类型 -> (检查函数, 类型描述)
+_TYPE_CHECKERS = {
+    "string": (_is_str, "字符串"),
+    "number": (_is_num, "数字"),
+    "boolean": (_is_bool, "布尔"),
+    "array": (_is_list, "数组"),
+    "object": (_is_dict, "对象"),
+}
+
+# jsonschema 类型名 -> 错误信息中的类型描述
+_TYPE_NAMES = {name: desc for name, (_, desc) in _TYPE_CHECKERS.items()}
+_TYPE_NAMES.update({"integer": "整数", "null": "空值"})
+
+# 预编译 Schema 缓存：id(schema) -> (schema, 编译结果)；保留 schema 引用，避免 id 被复用
+_COMPILED_SCHEMAS: Dict[int, tuple] = {}
+_COMPILED_SCHEMAS_MAX = 128
+
+
+def _compile_schema(schema: Dict[str, Any]) -> tuple:
+    """将 Schema 预编译为 (jsonschema 校验器或 None, 必需字段元组, ((字段, 检查函数, 错误信息), ...))"""
+    validator = Draft202012Validator(schema) if Draft202012Validator is not None else None
+    required = tuple(schema.get("required", []))
+    typed_fields = []
+    for field, prop in schema.get("properties", {}).items():
+        expected_type = prop.get("type")
+        # 联合类型（如 ["string", "null"]）交由 jsonschema 校验，简单校验只处理单一类型
+        checker = _TYPE_CHECKERS.get(expected_type) if isinstance(expected_type, str) else None
+        if checker:
+            typed_fields.append((field, checker[0], f"字段 {field} 应为{checker[1]}类型"))
+    return validator, required, tuple(typed_fields)
+
+
+def _format_schema_error(error) -> str:
+    """将 jsonschema 的校验错误转换为与内置校验一致的中文错误信息"""
+    path = ".".join(str(p) for p in error.absolute_path)
+    if error.validator == "required":
+        instance = error.instance if isinstance(error.instance, dict) else {}
+        missing = next((f for f in error.validator_value if f not in instance), None)
+        field = f"{path}.{missing}" if path and missing else (missing or path)
+        return f"缺少必需字段: {field}"
+    label = f"字段 {path} " if path else "参数"
+    if error.validator == "type":
+        expected = error.validator_value
+        names = [_TYPE_NAMES.get(t, t) for t in (expected if isinstance(expected, list) else [expected])]
+        return f"{label}应为{'或'.join(names)}类型"
+    if error.validator == "enum":
+        return f"{label}应为以下取值之一: {', '.join(map(str, error.validator_value))}"
+    return f"{label}不满足 Schema 约束: {error.validator}={error.validator_value}"
+
+
+def _compiled_schema(schema: Dict[str, Any]) -> tuple:
+    """获取 Schema 的预编译结果（按对象身份缓存）"""
+    entry = _COMPILED_SCHEMAS.get(id(schema))
+    if entry is not None and entry[0] is schema:
+        return entry[1]
+    compiled = _compile_schema(schema)
+    if len(_COMPILED_SCHEMAS) >= _COMPILED_SCHEMAS_MAX:
+        _COMPILED_SCHEMAS.clear()
+    _COMPILED_SCHEMAS[id(schema)] = (schema, compiled)
+    return compiled
+
 
 class ReActParser:
     """ReAct 格式解析器"""
     
-    # ReAct 格式的正则表达式
-    THOUGHT_PATTERN = re.compile(r'^Thought:\s*(.+?)(?=\n(?:Action|Final Answer)|\Z)', re.MULTILINE | re.DOTALL)
-    ACTION_PATTERN = re.compile(r'^Action:\s*(.+?)(?=\n)', re.MULTILINE)
-    ACTION_INPUT_PATTERN = re.compile(r'^Action Input:\s*(.+?)(?=\n(?:Observation|Thought|Action|Final Answer)|\Z)', re.MULTILINE | re.DOTALL)
-    OBSERVATION_PATTERN = re.compile(r'^Observation:\s*(.+?)(?=\n(?:Thought|Action|Final Answer)|\Z)', re.MULTILINE | re.DOTALL)
-    FINAL_ANSWER_PATTERN = re.compile(r'^Final Answer:\s*(.+)', re.MULTILINE | re.DOTALL)
-    
-    @classmethod
-    def extract_thought(cls, text: str) -> Optional[str]:
-        """提取思考内容"""
-        match = cls.THOUGHT_PATTERN.search(text)
-        return match.group(1).strip() if match else None
+    # 行首字段标签（冒号前的文本）-> 字段名
+    _LABELS = {
+        "Thought": "thought",
+        "Action": "action",
+        "Action Input": "action_input",
+        "Observation": "observation",
+        "Final Answer": "final_answer",
+    }
+    _MAX_LABEL_LEN = max(map(len, _LABELS))
+    _FIELDS = ("thought", "action", "action_input", "observation", "final_answer")
     
     @classmethod
-    def extract_action(cls, text: str) -> Optional[str]:
-        """提取动作名称"""
-        match = cls.ACTION_PATTERN.search(text)
-        return match.group(1).strip() if match else None
+    def parse(cls, text: str) -> Dict[str, Optional[str]]:
+        """解析 ReAct 文本的各字段（返回副本，可安全修改）"""
+        return dict(_parse_react(text))
     
     @classmethod
-    def extract_action_input(cls, text: str) -> Optional[Dict[str, Any]]:
-        """提取动作输入参数"""
-        match = cls.ACTION_INPUT_PATTERN.search(text)
-        if not match:
-            return None
+    def _scan(cls, text: str) -> Dict[str, Optional[str]]:
+        """逐行单次扫描 ReAct 文本，返回各字段首次出现的内容（已 strip，缺失为 None）
+        
+        行首标签切换当前字段，其余行作为当前字段的续行；
+        Final Answer 之后的全部内容都归入最终答案。
+        """
+        labels = cls._LABELS
+        max_label_len = cls._MAX_LABEL_LEN
+        fields: Dict[str, List[str]] = {}
+        current: Optional[List[str]] = None
+        in_final = False
+        for line in text.split("\n"):
+            if in_final:
+                current.append(line)
+                continue
+            # 找到首个冒号，用冒号前的文本做一次字典查找判断是否为标签行
+            colon = line.find(":", 0, max_label_len + 1)
+            key = labels.get(line[:colon]) if colon > 0 else None
+            if key is None:
+                if current is not None:
+                    current.append(line)
+            elif key in fields:
+                # 只保留首次出现的字段，重复段落忽略
+                current = None
+            else:
+                current = fields[key] = [line[colon + 1:]]
+                in_final = key == "final_answer"
         
-        input_str = match.group(1).strip()
+        result: Dict[str, Optional[str]] = {}
+        for key in cls._FIELDS:
+            parts = fields.get(key)
+            value = "\n".join(parts).strip() if parts else ""
+            result[key] = value or None
+        # 动作名称只取首行
+        if result["action"]:
+            result["action"] = result["action"].split("\n", 1)[0].strip()
+        return result
+    
+    @staticmethod
+    def _decode_action_input(input_str: str) -> Dict[str, Any]:
+        """解析动作输入：JSON 优先，其次 key=value，最后作为单个字符串参数"""
         try:
             # 尝试解析 JSON
-            return json.loads(input_str)
+            return _json_loads(input_str)
         except json.JSONDecodeError:
             # 如果不是有效 JSON，尝试简单的键值对解析
             try:
@@ -56,32 +185,55 @@ class ReActParser:
             except:
                 return {"input": input_str}
     
+    @classmethod
+    def extract_thought(cls, text: str) -> Optional[str]:
+        """提取思考内容"""
+        return _parse_react(text)["thought"]
+    
+    @classmethod
+    def extract_action(cls, text: str) -> Optional[str]:
+        """提取动作名称"""
+        return _parse_react(text)["action"]
+    
+    @classmethod
+    def extract_action_input(cls, text: str) -> Optional[Dict[str, Any]]:
+        """提取动作输入参数"""
+        input_str = _parse_react(text)["action_input"]
+        if input_str is None:
+            return None
+        return cls._decode_action_input(input_str)
+    
     @classmethod
     def extract_final_answer(cls, text: str) -> Optional[str]:
         """提取最终答案"""
-        match = cls.FINAL_ANSWER_PATTERN.search(text)
-        return match.group(1).strip() if match else None
+        return _parse_react(text)["final_answer"]
     
     @classmethod
     def parse_tool_call(cls, text: str) -> Optional[ToolCall]:
         """从文本中解析工具调用"""
-        action = cls.extract_action(text)
+        parsed = _parse_react(text)
+        action = parsed["action"]
         if not action:
             return None
         
-        action_input = cls.extract_action_input(text)
-        if action_input is None:
-            action_input = {}
+        input_str = parsed["action_input"]
+        action_input = cls._decode_action_input(input_str) if input_str is not None else {}
         
         return ToolCall(
-            name=action,
+            name=sys.intern(action),
             arguments=action_input
         )
     
     @classmethod
     def is_final_answer(cls, text: str) -> bool:
         """检查是否包含最终答案"""
-        return bool(cls.FINAL_ANSWER_PATTERN.search(text))
+        return _parse_react(text)["final_answer"] is not None
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_react(text: str) -> Dict[str, Optional[str]]:
+    """按文本缓存 ReAct 解析结果，供各 extract_* 共享（调用方不得修改返回的字典）"""
+    return ReActParser._scan(text)
 
 
 class HarmonyParser:
@@ -89,6 +241,8 @@ class HarmonyParser:
     
     # Harmony 格式的正则表达式（作为 XML 解析的备选方案）
     TOOL_TAG_PATTERN = re.compile(r'<tool\s+name\s*=\s*["\']([^"\']+)["\']\s*>(.*?)</tool>', re.DOTALL | re.IGNORECASE)
+    # 允许 name 前后出现其他属性，一次捕获 (name, 标签体)
+    TOOL_FULL_PATTERN = re.compile(r'<tool\s+[^>]*?name\s*=\s*["\']([^"\']+)["\'][^>]*>(.*?)</tool>', re.DOTALL | re.IGNORECASE)
     
     # Channel Commentary 格式（GPT OSS特有格式）
     # 兼容多种变体，例如：
@@ -99,19 +253,26 @@ class HarmonyParser:
         r'<\|channel\|>\s*commentary\s+to\s*=\s*([\w.-]+)\s*(?:code)?\s*(?:<\|constrain\|>\s*json)?\s*<\|message\|>\s*(\{[\s\S]*?\})',
         re.DOTALL | re.IGNORECASE
     )
+    # Channel Commentary 起始标记（用于扫描 + 平衡抽取 JSON）
+    CHANNEL_START_RE = re.compile(r'<\|channel\|>\s*commentary\s+to\s*=\s*([\w\.-]+)[^<]*<\|message\|>', re.IGNORECASE)
+    # 单次扫描用的交替正则：channel 分支只匹配起始标记（JSON 另行平衡抽取），xml 分支捕获完整标签
+    HARMONY_UNIFIED_PATTERN = re.compile(
+        r'(?P<channel><\|channel\|>\s*commentary\s+to\s*=\s*(?P<cname>[\w.-]+)[^<]*(?:<\|constrain\|>[^<]*)?<\|message\|>)'
+        r'|(?P<xml><tool\s+[^>]*?name\s*=\s*["\'](?P<xname>[^"\']+)["\'][^>]*>(?P<xbody>.*?)</tool>)',
+        re.DOTALL | re.IGNORECASE
+    )
+    TOOL_MARKER_PATTERN = re.compile(r'<\|channel\|>|<tool', re.IGNORECASE)
     
     @staticmethod
     def _strip_code_fences(text: str) -> str:
         """去除可能的 ``` 或 ```json 代码块包裹"""
-        try:
-            s = text.strip()
-            if s.startswith("```") and s.endswith("```"):
-                # 去除开头结尾围栏
-                s = re.sub(r"^```(?:json)?\s*", "", s)
-                s = re.sub(r"\s*```$", "", s)
-            return s.strip()
-        except Exception:
-            return text
+        s = text.strip()
+        if len(s) >= 6 and s.startswith("```") and s.endswith("```"):
+            # 去除开头结尾围栏及可选的 json 语言标记
+            s = s[3:-3]
+            if s.startswith("json"):
+                s = s[4:]
+        return s.strip()
 
     @staticmethod
     def _extract_balanced_json(text: str, start_pos: int = 0) -> Optional[str]:
@@ -147,87 +308,107 @@ class HarmonyParser:
         except Exception:
             return None
 
+    # web_search 允许的参数（驻留字符串，集合查找走指针比较快路径）
+    _WEB_SEARCH_ALLOWED = frozenset(map(sys.intern, ("query", "filter_list", "model", "is_simple_query")))
+
     @classmethod
     def _apply_web_search_whitelist(cls, args: Dict[str, Any]) -> Dict[str, Any]:
         """对 web_search 参数进行白名单过滤与最小清理"""
         try:
-            allowed = {"query", "filter_list", "model", "is_simple_query"}
+            allowed = cls._WEB_SEARCH_ALLOWED
             cleaned = {k: v for k, v in (args or {}).items() if k in allowed}
             return cleaned
         except Exception:
             return args or {}
 
+    # 工具名别名表（键统一 casefold，查找时只需一次哈希）
+    _ALIAS_MAP = {
+        alias.casefold(): target for alias, target in {
+            "web_search": "web_search",
+            "websearch": "web_search",
+            "search": "web_search",
+            "web-search": "web_search",
+            "internet_search": "web_search",
+            "internet": "web_search",
+            "browse": "web_search",
+            "web": "web_search",
+        }.items()
+    }
+
     @classmethod
     def _normalize_tool_name(cls, name: str) -> str:
-        try:
-            if not isinstance(name, str):
-                return name
-            alias_map = {
-                "websearch": "web_search",
-                "search": "web_search",
-                "web-search": "web_search",
-                "WebSearch": "web_search",
-                "internet_search": "web_search",
-                "internet": "web_search",
-                "browse": "web_search",
-                "web": "web_search",
-            }
-            return alias_map.get(name, alias_map.get(name.lower(), name))
-        except Exception:
+        if not isinstance(name, str):
             return name
+        # 驻留规范化后的工具名，后续注册表/白名单等字典查找可直接按身份命中
+        return sys.intern(cls._ALIAS_MAP.get(name.casefold(), name))
+
+    @classmethod
+    def _parse_arguments(cls, content: str) -> Dict[str, Any]:
+        """将工具标签内的文本解析为参数：JSON 优先，其次平衡 JSON，最后作为字符串输入"""
+        content = cls._strip_code_fences(content.strip())
+        if not content:
+            return {}
+        try:
+            # 先尝试直接解析
+            return _json_loads(content)
+        except json.JSONDecodeError:
+            # 退化：尝试从中抽取平衡 JSON
+            candidate = cls._extract_balanced_json(content, 0)
+            if candidate:
+                try:
+                    return _json_loads(candidate)
+                except Exception:
+                    pass
+            # 如果不是 JSON，作为简单字符串处理
+            return {"input": content}
+
+    @staticmethod
+    def _parse_xml_block(block: str) -> Optional[tuple]:
+        """慢路径：标签体内含子标签或实体时交给 XML 解析器，返回 (name, text)"""
+        # 仅在慢路径中按需导入，常见的纯 JSON 标签体不会触发
+        import xml.etree.ElementTree as ET
+        try:
+            root = ET.fromstring(block)
+        except ET.ParseError:
+            return None
+        name = root.get('name')
+        if not name:
+            return None
+        return name, root.text or ""
+
+    @classmethod
+    def _build_xml_call(cls, name: str, content: str, block: str) -> Optional[ToolCall]:
+        """由 <tool> 标签的 name 与标签体构造工具调用；XML 慢路径失败时返回 None"""
+        if '<' in content or '&' in content:
+            parsed = cls._parse_xml_block(block)
+            if parsed is None:
+                # XML 解析失败，留给正则方法处理
+                return None
+            name, content = parsed
+        
+        name = cls._normalize_tool_name(name)
+        arguments = cls._parse_arguments(content)
+        
+        if name == "web_search" and isinstance(arguments, dict):
+            arguments = cls._apply_web_search_whitelist(arguments)
+        
+        return ToolCall(
+            name=name,
+            arguments=arguments
+        )
 
     @classmethod
     def parse_xml_tools(cls, text: str) -> List[ToolCall]:
-        """使用 XML 解析器提取工具调用（优先方法）"""
+        """提取 <tool name="..."> 工具调用（优先方法）
+        
+        单次正则扫描直接拿到 name 与标签体；仅当标签体含 '<' 或 '&' 时才走 XML 解析。
+        """
         tool_calls = []
         
-        # 尝试提取所有 <tool> 标签
-        tool_blocks = re.findall(r'<tool[^>]*>.*?</tool>', text, re.DOTALL | re.IGNORECASE)
-        
-        for block in tool_blocks:
-            try:
-                # 解析 XML
-                root = ET.fromstring(block)
-                name = root.get('name')
-                
-                if not name:
-                    continue
-                
-                name = cls._normalize_tool_name(name)
-                # 获取工具参数
-                content = root.text or ""
-                content = content.strip()
-                content = cls._strip_code_fences(content)
-                
-                if content:
-                    try:
-                        # 先尝试直接解析
-                        arguments = json.loads(content)
-                    except json.JSONDecodeError:
-                        # 退化：尝试从中抽取平衡 JSON
-                        candidate = cls._extract_balanced_json(content, 0)
-                        if candidate:
-                            try:
-                                arguments = json.loads(candidate)
-                            except Exception:
-                                arguments = {"input": content}
-                        else:
-                            # 如果不是 JSON，作为简单字符串处理
-                            arguments = {"input": content}
-                else:
-                    arguments = {}
-                
-                if name == "web_search" and isinstance(arguments, dict):
-                    arguments = cls._apply_web_search_whitelist(arguments)
-                
-                tool_calls.append(ToolCall(
-                    name=name,
-                    arguments=arguments
-                ))
-                
-            except ET.ParseError:
-                # XML 解析失败，尝试正则表达式
-                continue
+        for m in cls.TOOL_FULL_PATTERN.finditer(text):
+            tool_call = cls._build_xml_call(m.group(1), m.group(2), m.group(0))
+            if tool_call:
+                tool_calls.append(tool_call)
         
         return tool_calls
     
@@ -239,24 +420,8 @@ class HarmonyParser:
         matches = cls.TOOL_TAG_PATTERN.findall(text)
         
         for name, content in matches:
-            content = content.strip()
             name = cls._normalize_tool_name(name)
-            content = cls._strip_code_fences(content)
-            
-            if content:
-                try:
-                    arguments = json.loads(content)
-                except json.JSONDecodeError:
-                    candidate = cls._extract_balanced_json(content, 0)
-                    if candidate:
-                        try:
-                            arguments = json.loads(candidate)
-                        except Exception:
-                            arguments = {"input": content}
-                    else:
-                        arguments = {"input": content}
-            else:
-                arguments = {}
+            arguments = cls._parse_arguments(content)
             
             if name == "web_search" and isinstance(arguments, dict):
                 arguments = cls._apply_web_search_whitelist(arguments)
@@ -268,6 +433,40 @@ class HarmonyParser:
         
         return tool_calls
     
+    @classmethod
+    def _clean_web_search_args(cls, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Channel Commentary 下 web_search 参数的兼容清洗与白名单
+        
+        topn/source/categories/id/cursor/page 等模型常带的参数都不在白名单内，
+        一次性过滤并以单条 DEBUG 记录被移除的参数（source/categories 由外部 SearxNG 控制）。
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            removed = [k for k in arguments if k not in cls._WEB_SEARCH_ALLOWED]
+            if removed:
+                logger.debug(
+                    "[HarmonyParser] 移除 web_search 不支持的参数: %s", removed,
+                    extra={"tool_name": "web_search", "removed_args": removed},
+                )
+        return cls._apply_web_search_whitelist(arguments)
+
+    @classmethod
+    def _build_channel_call(cls, text: str, name: str, json_start: int) -> tuple:
+        """从 <|message|> 之后平衡抽取 JSON 构造工具调用，返回 (ToolCall 或 None, 消费结束位置)"""
+        tool_name = cls._normalize_tool_name(name)
+        json_block = cls._strip_code_fences(text[json_start:])
+        candidate = cls._extract_balanced_json(json_block, 0)
+        if not candidate:
+            return None, json_start
+        try:
+            arguments = _json_loads(candidate)
+        except Exception:
+            return None, json_start
+
+        if tool_name == "web_search" and isinstance(arguments, dict):
+            arguments = cls._clean_web_search_args(arguments)
+
+        return ToolCall(name=tool_name, arguments=arguments), json_start + len(candidate)
+
     @classmethod
     def parse_channel_commentary(cls, text: str) -> List[ToolCall]:
         """解析 Channel Commentary 格式（GPT OSS特有）"""
@@ -275,55 +474,18 @@ class HarmonyParser:
 
         # 优先：更稳健的扫描与平衡抽取
         try:
-            # 允许出现多个 Channel Commentary 片段
-            channel_start_re = re.compile(r'<\|channel\|>\s*commentary\s+to\s*=\s*([\w\.-]+)[^<]*<\|message\|>', re.IGNORECASE)
-            pos = 0
-            while True:
-                m = channel_start_re.search(text, pos)
-                if not m:
-                    break
-                tool_name = m.group(1)
-                tool_name = cls._normalize_tool_name(tool_name)
-                # 从 <|message|> 后开始提取 JSON
-                msg_pos = text.find('<|message|>', m.start())
-                if msg_pos == -1:
-                    pos = m.end()
-                    continue
-                json_start = msg_pos + len('<|message|>')
-                json_block = text[json_start:]
-                json_block = cls._strip_code_fences(json_block)
-                candidate = cls._extract_balanced_json(json_block, 0)
-                if not candidate:
-                    pos = m.end()
-                    continue
-                try:
-                    arguments = json.loads(candidate)
-                except Exception:
-                    pos = m.end()
+            # 允许出现多个 Channel Commentary 片段；finditer 一次扫描，跳过已被 JSON 消费的区域
+            last_end = 0
+            for m in cls.CHANNEL_START_RE.finditer(text):
+                if m.start() < last_end:
                     continue
-
-                if tool_name == "web_search" and isinstance(arguments, dict):
-                    # 兼容清洗与白名单
-                    if "topn" in arguments:
-                        _ = arguments.pop("topn", None)
-                        print("[HarmonyParser] 移除不支持的topn参数")
-                    if "source" in arguments:
-                        _ = arguments.pop("source", None)
-                        print("[HarmonyParser] 移除source参数，由外部SearxNG控制")
-                    if "categories" in arguments:
-                        _ = arguments.pop("categories", None)
-                        print("[HarmonyParser] 移除categories参数，由外部SearxNG控制")
-                    for invalid in ("id", "cursor", "index", "page"):
-                        if invalid in arguments:
-                            _ = arguments.pop(invalid, None)
-                            print(f"[HarmonyParser] 移除无效参数: {invalid}")
-                    arguments = cls._apply_web_search_whitelist(arguments)
-
-                tool_calls.append(ToolCall(name=tool_name, arguments=arguments))
-                # 移动搜索位置，避免死循环
-                pos = json_start + len(candidate)
+                tool_call, end = cls._build_channel_call(text, m.group(1), m.end())
+                if tool_call:
+                    tool_calls.append(tool_call)
+                    # 记录已消费区域，避免把 JSON 内部的片段再次当作工具调用
+                    last_end = end
         except Exception as e:
-            print(f"[HarmonyParser] Channel Commentary 扫描异常: {e}")
+            logger.warning("[HarmonyParser] Channel Commentary 扫描异常: %s", e)
 
         # 回退：原有的正则一次性匹配（可能会误切）
         if not tool_calls:
@@ -332,13 +494,9 @@ class HarmonyParser:
                 try:
                     tool_name = cls._normalize_tool_name(tool_name)
                     json_content = cls._strip_code_fences(json_content)
-                    arguments = json.loads(json_content)
+                    arguments = _json_loads(json_content)
                     if tool_name == "web_search" and isinstance(arguments, dict):
-                        for invalid in ("id", "cursor", "index", "page"):
-                            if invalid in arguments:
-                                _ = arguments.pop(invalid, None)
-                                print(f"[HarmonyParser] 移除无效参数: {invalid}")
-                        arguments = cls._apply_web_search_whitelist(arguments)
+                        arguments = cls._clean_web_search_args(arguments)
                     tool_calls.append(ToolCall(name=tool_name, arguments=arguments))
                 except json.JSONDecodeError:
                     continue
@@ -347,9 +505,47 @@ class HarmonyParser:
     
     @classmethod
     def parse_tool_calls(cls, text: str) -> List[ToolCall]:
-        """从文本中解析工具调用"""
+        """从文本中解析工具调用（结果按文本缓存，每次返回新的 ToolCall 实例）"""
+        return [
+            ToolCall(name=name, arguments=dict(arguments) if isinstance(arguments, dict) else arguments)
+            for name, arguments in _parse_harmony(text or "")
+        ]
+    
+    @classmethod
+    def _parse_tool_calls_uncached(cls, text: str) -> List[ToolCall]:
+        """从文本中解析工具调用
+        
+        先用一条交替正则单次扫描 Channel Commentary 与 <tool> 两种格式；
+        均未命中且文本含工具标记时，再回退到逐格式的完整解析。
+        """
         # 统一预处理：去围栏
         pre = cls._strip_code_fences(text or "")
+        
+        channel_calls: List[ToolCall] = []
+        xml_calls: List[ToolCall] = []
+        last_end = 0
+        for m in cls.HARMONY_UNIFIED_PATTERN.finditer(pre):
+            if m.start() < last_end:
+                continue
+            if m.lastgroup == "channel":
+                tool_call, end = cls._build_channel_call(pre, m.group("cname"), m.end())
+                if tool_call:
+                    channel_calls.append(tool_call)
+                    last_end = end
+            else:
+                tool_call = cls._build_xml_call(m.group("xname"), m.group("xbody"), m.group("xml"))
+                if tool_call:
+                    xml_calls.append(tool_call)
+        
+        # 与原有优先级一致：Channel Commentary 优先于 <tool> 标签
+        if channel_calls:
+            return channel_calls
+        if xml_calls:
+            return xml_calls
+        if not cls.TOOL_MARKER_PATTERN.search(pre):
+            return []
+        
+        # 回退：逐格式解析
         # 先尝试 Channel Commentary 格式（GPT OSS）
         tool_calls = cls.parse_channel_commentary(pre)
         
@@ -365,13 +561,31 @@ class HarmonyParser:
     
     @classmethod
     def has_tool_calls(cls, text: str) -> bool:
-        """检查文本中是否包含工具调用"""
-        return bool(cls.TOOL_TAG_PATTERN.search(text) or cls.CHANNEL_PATTERN.search(text))
+        """检查文本中是否包含工具调用（与 parse_tool_calls 共享缓存）"""
+        return bool(_parse_harmony(text or ""))
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_harmony(text: str) -> tuple:
+    """按文本缓存 Harmony 解析结果，存为 ((name, arguments), ...)，避免缓存可变的 ToolCall"""
+    return tuple(
+        (tool_call.name, tool_call.arguments)
+        for tool_call in HarmonyParser._parse_tool_calls_uncached(text)
+    )
 
 
 class ToolCallValidator:
     """工具调用验证器"""
     
+    @staticmethod
+    def compile_schema(schema: Dict[str, Any]) -> None:
+        """预编译 Schema（工具注册时调用），之后的 validate_json_schema 直接命中缓存
+        
+        Raises:
+            Schema 本身无效时抛出 jsonschema 的异常
+        """
+        _compiled_schema(schema)
+    
     @staticmethod
     def validate_json_schema(arguments: Dict[str, Any], schema: Dict[str, Any]) -> tuple[bool, Optional[str]]:
         """简单的 JSON Schema 验证
@@ -384,60 +598,61 @@ class ToolCallValidator:
             (是否有效, 错误信息)
         """
         try:
-            # 检查必需字段
-            required_fields = schema.get("properties", {}).keys()
-            required = schema.get("required", [])
-            
-            for field in required:
-                if field not in arguments:
-                    return False, f"缺少必需字段: {field}"
-            
-            # 简单类型检查
-            properties = schema.get("properties", {})
-            for field, value in arguments.items():
-                if field in properties:
-                    expected_type = properties[field].get("type")
-                    if expected_type == "string" and not isinstance(value, str):
-                        return False, f"字段 {field} 应为字符串类型"
-                    elif expected_type == "number" and not isinstance(value, (int, float)):
-                        return False, f"字段 {field} 应为数字类型"
-                    elif expected_type == "boolean" and not isinstance(value, bool):
-                        return False, f"字段 {field} 应为布尔类型"
-                    elif expected_type == "array" and not isinstance(value, list):
-                        return False, f"字段 {field} 应为数组类型"
-                    elif expected_type == "object" and not isinstance(value, dict):
-                        return False, f"字段 {field} 应为对象类型"
-            
-            return True, None
-            
+            validator, required, typed_fields = _compiled_schema(schema)
         except Exception as e:
             return False, f"Schema 验证出错: {str(e)}"
+        
+        if validator is not None:
+            try:
+                error = next(validator.iter_errors(arguments), None)
+            except Exception as e:
+                return False, f"Schema 验证出错: {str(e)}"
+            if error is None:
+                return True, None
+            return False, _format_schema_error(error)
+        
+        # 回退：基于预编译字段元组的简单校验
+        for field in required:
+            if field not in arguments:
+                return False, f"缺少必需字段: {field}"
+        for field, checker, message in typed_fields:
+            if field in arguments and not checker(arguments[field]):
+                return False, message
+        return True, None
     
     @staticmethod
     def sanitize_arguments(arguments: Dict[str, Any]) -> Dict[str, Any]:
         """清理和标准化工具参数"""
-        # 移除空值
-        cleaned = {k: v for k, v in arguments.items() if v is not None}
-        
-        # 转换字符串数字
-        for key, value in cleaned.items():
-            if isinstance(value, str):
-                # 尝试转换为数字
-                try:
-                    if value.isdigit():
-                        cleaned[key] = int(value)
-                    elif '.' in value:
-                        cleaned[key] = float(value)
-                except ValueError:
-                    pass
-                # 布尔值字符串
-                low = value.strip().lower()
-                if low in ("true", "false"):
-                    cleaned[key] = (low == "true")
-                # 逗号分隔数组
-                if ',' in value and key.endswith(('_list', 's')):
-                    arr = [item.strip() for item in value.split(',') if item.strip()]
-                    if arr:
-                        cleaned[key] = arr
+        # 单次遍历：移除空值并完成类型转换，各分支互斥，命中即跳过后续判断。
+        # 只转换与原先逐项覆盖相同的情形："-5"、" 42 " 这类字符串保持原样
+        cleaned: Dict[str, Any] = {}
+        for key, value in arguments.items():
+            if value is None:
+                continue
+            if type(value) is not str:
+                cleaned[key] = value
+                continue
+            # 逗号分隔数组
+            if ',' in value and key.endswith(('_list', 's')):
+                arr = [item.strip() for item in value.split(',') if item.strip()]
+                if arr:
+                    cleaned[key] = arr
+                    continue
+            # 布尔值字符串
+            low = value.strip().lower()
+            if low == "true" or low == "false":
+                cleaned[key] = (low == "true")
+                continue
+            # 纯数字字符串转整数，含小数点的尝试转浮点数
+            try:
+                if value.isdigit():
+                    cleaned[key] = int(value)
+                    continue
+                if '.' in value:
+                    cleaned[key] = float(value)
+                    continue
+            except ValueError:
+                pass
+            cleaned[key] = value
         
         return cleaned
@@ -1,21 +1,43 @@
 """
 问题拆解器 - 将复杂问题分解为可处理的子问题
 """
+import re
+import copy
 import json
-from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+import functools
+import time
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set, Tuple
 from .models import ToolExecutionContext
 import httpx
-from ..config import DEFAULT_SEARCH_MODEL, LLM_SERVICE_URL, LLM_DEFAULT_TIMEOUT, NORMAL_MAX_SUB_QUERIES
+import numpy as np
+from ..config import (
+    DEFAULT_SEARCH_MODEL, LLM_SERVICE_URL, LLM_DEFAULT_TIMEOUT, NORMAL_MAX_SUB_QUERIES,
+    DECOMPOSITION_CACHE_ENABLED, DECOMPOSITION_CACHE_MAX_SIZE, DECOMPOSITION_CACHE_TTL_SECONDS,
+    DECOMPOSITION_SEMANTIC_CACHE_ENABLED, DECOMPOSITION_SEMANTIC_CACHE_THRESHOLD,
+    DECOMPOSITION_FUSE_COMPLEXITY_JUDGE,
+    DECOMPOSITION_MAX_TOKENS, LLM_MAX_CONCURRENCY,
+)
+from ..embedding_client import embed_query
+from ..services.network import get_llm_httpx_client
+from ..utils.json_repair import repair_truncated_json, strip_code_fence
 
+logger = logging.getLogger(__name__)
 
-class QueryDecomposer:
-    """
-    问题拆解器：将复杂问题分解为可处理的子问题
-    """
-    
-    def __init__(self, llm_service_url: str = LLM_SERVICE_URL):
-        self.llm_service_url = llm_service_url
-        self.decomposition_prompt = """
+# 拆解提示词版本：修改 decomposition_prompt 或分类提示词时递增，使旧缓存自然失效
+DECOMPOSITION_PROMPT_VERSION = "v2"
+
+# 拆解缓存为模块级共享：IntelligentOrchestrator（及其 QueryDecomposer）按请求创建，
+# 缓存挂在实例上会随请求结束而丢失
+_DECOMPOSITION_CACHE: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_SEMANTIC_CACHES: Dict[str, "SemanticCache"] = {}
+_JUDGE_INFLIGHT: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+# 问题拆解提示词模板（模块级常量，各实例共享）
+DECOMPOSITION_PROMPT = """
 你是一个专业的问题分析专家。请将用户的问题拆解为合适数量的独立子问题。
 
 用户问题: {query}
@@ -23,6 +45,8 @@ class QueryDecomposer:
 聊天历史上下文: {conversation_context}
 
 拆解要求:
+0. 若问题复杂度为"待判断"，请先判断复杂度（简单|中等|复杂）并填入 complexity_level；
+   判断为简单时无需拆解，sub_queries 只包含原始问题本身
 1. 充分考虑聊天历史上下文：
    - 如果聊天历史为空或"无历史记录"，仅基于当前问题进行分解
    - 如果有聊天历史，分析用户的意图是否与之前的对话相关
@@ -42,7 +66,7 @@ class QueryDecomposer:
 {{
   "original_query": "{query}",
   "query_type": "事实性|推理性|操作性|混合型",
-  "complexity_level": "{complexity}",
+  "complexity_level": "{complexity_level}",
   "sub_queries": [
     {{
       "id": 1,
@@ -59,6 +83,241 @@ class QueryDecomposer:
 请确保返回的是有效的JSON格式。
 """
 
+# 提示词预渲染时为问题与聊天历史占位的哨兵标记
+_PROMPT_SLOT_RE = re.compile("\x00([QC])\x00")
+
+
+@functools.lru_cache(maxsize=16)
+def _decomposition_prompt_parts(template: str, complexity: str, complexity_level: str) -> Tuple[str, ...]:
+    """
+    按复杂度预渲染拆解提示词模板：除问题与聊天历史外的占位符一次性填好，
+    返回按哨兵切分的片段（偶数位为静态文本，奇数位为槽位名 Q/C）
+    """
+    rendered = template.format(
+        query="\x00Q\x00",
+        conversation_context="\x00C\x00",
+        complexity=complexity,
+        complexity_level=complexity_level,
+        max_sub_queries=NORMAL_MAX_SUB_QUERIES,
+    )
+    return tuple(_PROMPT_SLOT_RE.split(rendered))
+
+
+def _render_decomposition_prompt(
+    template: str,
+    complexity: str,
+    complexity_level: str,
+    query: str,
+    conversation_context: str
+) -> str:
+    """用预渲染片段拼接拆解提示词，运行时只做一次 join"""
+    parts = _decomposition_prompt_parts(template, complexity, complexity_level)
+    slots = {"Q": query, "C": conversation_context}
+    return "".join(slots[part] if i % 2 else part for i, part in enumerate(parts))
+
+
+_QUESTION_MARK_RE = re.compile(r"[?？]")
+# 含这些连接/比较词的短问题也可能需要拆解，不做启发式直判
+_COMPOUND_QUERY_RE = re.compile(r"并且|同时|或者|比较|分析")
+# 启发式直判为简单问题的最大字符数
+_OBVIOUS_SIMPLE_MAX_CHARS = 10
+
+# LLM 请求/响应的 JSON 编解码：优先 orjson（其 JSONDecodeError 继承自 json.JSONDecodeError），
+# 未安装时回退到标准库（json.loads 同样接受 bytes，可直接解码响应体）
+try:
+    from orjson import loads as _json_loads, dumps as _json_dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# 请求体由 _json_dumps 预先序列化为 bytes，需显式声明内容类型
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@functools.lru_cache(maxsize=4096)
+def _analyze_query_complexity(query: str) -> str:
+    """启发式复杂度评估（按问题文本缓存，同一问题在路由/拆解/重试中只计算一次）"""
+    # 简化的启发式规则，主要基于长度和结构
+    word_count = len(query.split())
+    question_marks = len(_QUESTION_MARK_RE.findall(query))
+    
+    # 基本的复杂度评估
+    if word_count <= 8 and question_marks <= 1:
+        return "简单"
+    elif word_count > 25 or question_marks > 1:
+        return "复杂"
+    else:
+        return "中等"
+
+
+# LLM 拆解结果必须包含的字段
+_REQUIRED_DECOMPOSITION_FIELDS = frozenset({"sub_queries", "query_type"})
+
+# 实体提取：引号（含中文引号）与书名号中的内容、大写开头的英文专有名词
+_QUOTED_ENTITY_RE = re.compile(r'"([^"]*)"|“([^”]*)”|《([^》]*)》')
+_PROPER_NOUN_RE = re.compile(r'\b[A-Z][a-z]+\b')
+
+
+@functools.lru_cache(maxsize=2048)
+def _extract_key_entities(query: str) -> Tuple[str, ...]:
+    """提取关键实体（按问题文本缓存，返回去重后的元组）"""
+    entities = set()
+    for groups in _QUOTED_ENTITY_RE.findall(query):
+        entities.update(g for g in groups if g)
+    entities.update(_PROPER_NOUN_RE.findall(query))
+    return tuple(entities)
+
+
+# 不支持 response_format=json_schema 的 LLM 端点（首次被拒后记录，之后不再携带）
+_STRUCTURED_OUTPUT_UNSUPPORTED: Set[str] = set()
+
+# 限制辅助 LLM 请求的并发数：突发流量在本地有序排队，而不是全部压到 LLM 服务端
+_llm_semaphore = asyncio.Semaphore(max(1, LLM_MAX_CONCURRENCY))
+
+
+class SemanticCache:
+    """
+    语义缓存：按 embedding 余弦相似度匹配近似问题（如同一问题的不同问法）
+
+    向量归一化后存放在连续的 float32 矩阵中，一次矩阵乘（BLAS）即可得到与所有条目的相似度；
+    矩阵按需倍增扩容至 max_size，之后按环形缓冲覆盖最旧的条目。
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, max_size: int, ttl: float, threshold: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._emb_matrix: Optional[np.ndarray] = None
+        self._stored_at = np.zeros(0, dtype=np.float64)
+        self._values: List[Optional[Dict[str, Any]]] = []
+        self._count = 0
+        self._next = 0
+
+    def _allocate(self, capacity: int, dim: int) -> None:
+        """分配（或倍增扩容）存储，保留已有条目"""
+        matrix = np.empty((capacity, dim), dtype=np.float32)
+        stored_at = np.zeros(capacity, dtype=np.float64)
+        if self._emb_matrix is not None and self._emb_matrix.shape[1] == dim:
+            matrix[:self._count] = self._emb_matrix[:self._count]
+            stored_at[:self._count] = self._stored_at[:self._count]
+        else:
+            self._count = 0
+            self._next = 0
+            self._values = []
+        self._values.extend([None] * (capacity - len(self._values)))
+        self._emb_matrix = matrix
+        self._stored_at = stored_at
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        if norm == 0.0:
+            return None
+        return v / norm
+
+    def lookup(self, vector: List[float]) -> Optional[Dict[str, Any]]:
+        """返回相似度不低于阈值且未过期的缓存值，否则返回 None"""
+        if self._count == 0 or self._emb_matrix is None:
+            return None
+        v = self._normalize(vector)
+        if v is None or v.shape[0] != self._emb_matrix.shape[1]:
+            return None
+        sims = self._emb_matrix[:self._count] @ v
+        # 过期条目不参与匹配
+        expired = time.monotonic() - self._stored_at[:self._count] > self.ttl
+        sims[expired] = -1.0
+        i = int(sims.argmax())
+        if sims[i] >= self.threshold:
+            return self._values[i]
+        return None
+
+    def add(self, vector: List[float], value: Dict[str, Any]) -> None:
+        """写入一条缓存；容量满时覆盖最旧的条目"""
+        v = self._normalize(vector)
+        if v is None:
+            return
+        dim = v.shape[0]
+        if self._emb_matrix is None or self._emb_matrix.shape[1] != dim:
+            # 首次写入（或 embedding 维度变化）时按实际维度分配矩阵
+            self._allocate(min(self.INITIAL_CAPACITY, self.max_size), dim)
+        i = self._next
+        capacity = self._emb_matrix.shape[0]
+        if i == capacity:
+            if capacity < self.max_size:
+                self._allocate(min(capacity * 2, self.max_size), dim)
+            else:
+                i = 0
+        self._emb_matrix[i] = v
+        self._stored_at[i] = time.monotonic()
+        self._values[i] = value
+        self._next = i + 1
+        self._count = min(self._count + 1, self.max_size)
+
+
+class QueryDecomposer:
+    """
+    问题拆解器：将复杂问题分解为可处理的子问题
+    """
+    
+    # 请求体中不变的系统消息：类级常量，避免每次请求重新构造
+    _DECOMPOSITION_SYSTEM_MSG = {
+        "role": "system",
+        "content": "你是一个专业的问题分析专家，擅长将复杂问题分解为简单的子问题。请始终返回有效的JSON格式。"
+    }
+    _JUDGE_SYSTEM_PROMPT = (
+        "你是一个严格的问题分类器。只输出JSON且不包含额外文本。\n"
+        "请基于用户当前问题和对话历史来判断三个维度：\n"
+        "1. complexity（复杂度）：简单/中等/复杂\n"
+        "2. fast_route（快速路由）：是否可跳过复杂的问题拆解流程\n"
+        "3. needs_tools（需要工具）：是否需要调用外部工具（搜索、API等）获取信息\n\n"
+        
+        "判断标准：\n"
+        "- needs_tools=false：纯概念解释、定义、常识问答，基于已有知识即可回答\n"
+        "- needs_tools=true：需要实时信息、具体数据、最新资讯的查询\n"
+        "- fast_route=true：单一直接的问题，无需复杂推理\n"
+        "- fast_route=false：需要多步推理、多维度分析的复杂问题\n\n"
+        
+        '输出格式：{"complexity": "简单|中等|复杂", "fast_route": true/false, "needs_tools": true/false, "reason": "不超过50字"}。\n'
+        "无法确定时，将 fast_route 和 needs_tools 都设为 true，complexity 设为 中等。"
+    )
+    _JUDGE_SYSTEM_MSG = {"role": "system", "content": _JUDGE_SYSTEM_PROMPT}
+    _JUDGE_RESPONSE_FORMAT = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "query_classification",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "complexity": {"type": "string", "enum": ["简单", "中等", "复杂"]},
+                    "fast_route": {"type": "boolean"},
+                    "needs_tools": {"type": "boolean"},
+                    "reason": {"type": "string", "maxLength": 50},
+                },
+                "required": ["complexity", "fast_route", "needs_tools", "reason"],
+                "additionalProperties": False,
+            },
+        },
+    }
+    
+    def __init__(self, llm_service_url: str = LLM_SERVICE_URL):
+        self.llm_service_url = llm_service_url
+        self._chat_url = f"{llm_service_url.rstrip('/')}/chat/completions"
+        # 拆解结果缓存：key -> (缓存时间, 拆解结果)，按 LRU 淘汰
+        self._resp_cache = _DECOMPOSITION_CACHE
+        self._resp_cache_max_size = DECOMPOSITION_CACHE_MAX_SIZE
+        self._resp_cache_ttl = DECOMPOSITION_CACHE_TTL_SECONDS
+        # 语义缓存：按模型分别维护，避免不同模型的拆解结果互相命中
+        self._semantic_caches = _SEMANTIC_CACHES
+        # 进行中的复杂度判断：相同问题/模型/历史的并发请求共享同一次 LLM 调用
+        self._judge_inflight = _JUDGE_INFLIGHT
+        self.decomposition_prompt = DECOMPOSITION_PROMPT
+
     async def decompose(self, query: str, context: Optional[ToolExecutionContext] = None, conversation_history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """
         将复杂问题拆解为子问题
@@ -70,166 +329,284 @@ class QueryDecomposer:
         Returns:
             包含拆解结果的字典
         """
-        try:
-            # 优先使用 LLM 判断复杂度，失败则回退到启发式
+        if not DECOMPOSITION_CACHE_ENABLED or self._resp_cache_max_size <= 0:
+            decomposition, _ = await self._decompose_uncached(query, context, conversation_history)
+            return decomposition
+        
+        model_name = context.run_config.model if context else DEFAULT_SEARCH_MODEL
+        key = self._resp_cache_key(query, model_name, conversation_history)
+        entry = self._resp_cache.get(key)
+        if entry is not None:
+            cached_at, cached = entry
+            if time.monotonic() - cached_at <= self._resp_cache_ttl:
+                self._resp_cache.move_to_end(key)
+                logger.debug("拆解结果缓存命中: %s", query[:50])
+                return copy.deepcopy(cached)
+            del self._resp_cache[key]
+        
+        # 精确缓存未命中时尝试语义缓存；有聊天历史时问题含义依赖上下文，不做近似匹配
+        query_vector = None
+        if DECOMPOSITION_SEMANTIC_CACHE_ENABLED and not conversation_history:
             try:
-                judged = await self._judge_complexity_with_llm(query, context)
-                complexity = judged.get("complexity", "中等")
-                if complexity not in ("简单", "中等", "复杂"):
+                query_vector = await embed_query(query)
+            except Exception as e:
+                logger.warning("语义缓存 embedding 失败，跳过: %s", e)
+            if query_vector is not None:
+                semantic_cache = self._semantic_caches.get(model_name)
+                cached = semantic_cache.lookup(query_vector) if semantic_cache else None
+                if cached is not None:
+                    decomposition = self._adapt_semantic_hit(query, cached)
+                    if decomposition is not None:
+                        logger.debug("语义缓存命中: %s", query[:50])
+                        return decomposition
+                    logger.debug("语义缓存命中但关键实体不一致，放弃复用: %s", query[:50])
+        
+        decomposition, cacheable = await self._decompose_uncached(query, context, conversation_history)
+        if cacheable:
+            self._resp_cache[key] = (time.monotonic(), copy.deepcopy(decomposition))
+            self._resp_cache.move_to_end(key)
+            while len(self._resp_cache) > self._resp_cache_max_size:
+                self._resp_cache.popitem(last=False)
+            if query_vector is not None:
+                semantic_cache = self._semantic_caches.get(model_name)
+                if semantic_cache is None:
+                    semantic_cache = SemanticCache(
+                        self._resp_cache_max_size, self._resp_cache_ttl, DECOMPOSITION_SEMANTIC_CACHE_THRESHOLD
+                    )
+                    self._semantic_caches[model_name] = semantic_cache
+                semantic_cache.add(query_vector, copy.deepcopy(decomposition))
+        return decomposition
+
+    def _adapt_semantic_hit(self, query: str, cached: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        将语义缓存命中的拆解结果适配到当前问题，无法安全复用时返回 None
+
+        相似度很高的问题可能只替换了实体（如"北京今天天气"与"上海今天天气"），
+        而缓存结果的子问题与关键实体都来自原问题：简单问题按当前问题重建快速结果；
+        其余情况要求缓存结果的关键实体都出现在当前问题中，否则放弃命中
+        """
+        if cached.get("complexity_level") == "简单":
+            return self._create_simple_decomposition(query)
+        entities = [e.strip().lower() for e in cached.get("key_entities") or [] if isinstance(e, str) and e.strip()]
+        if not entities:
+            return None
+        lowered = query.lower()
+        if any(entity not in lowered for entity in entities):
+            return None
+        decomposition = copy.deepcopy(cached)
+        decomposition["original_query"] = query
+        return decomposition
+
+    def _resp_cache_key(
+        self,
+        query: str,
+        model: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """生成拆解缓存键：问题 + 模型 + 聊天历史上下文 + 提示词版本"""
+        history_context = self._format_conversation_history(conversation_history)
+        raw = f"{query}|{model}|{history_context}|{DECOMPOSITION_PROMPT_VERSION}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    async def _decompose_uncached(
+        self,
+        query: str,
+        context: Optional[ToolExecutionContext] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        实际执行问题拆解（不经过缓存）
+        
+        Returns:
+            (拆解结果, 是否可缓存)；回退结果不缓存，避免把一次失败固化下来
+        """
+        try:
+            # 明显的简单短问题直接走快速结果，跳过 LLM 调用；
+            # 有聊天历史时短问题常是追问（如"那上海呢"），需由拆解提示词结合历史补全
+            if not conversation_history and self._obvious_simple(query):
+                return self._create_simple_decomposition(query), True
+            
+            if DECOMPOSITION_FUSE_COMPLEXITY_JUDGE:
+                # 复杂度判断与拆解合并为一次 LLM 调用，由拆解提示词先判断复杂度
+                complexity = "待判断"
+                complexity_level = "简单|中等|复杂"
+            else:
+                # 两步模式：先用 LLM 判断复杂度，失败则回退到启发式
+                try:
+                    judged = await self._judge_complexity_with_llm(query, context)
+                    complexity = judged.get("complexity", "中等")
+                    if complexity not in ("简单", "中等", "复杂"):
+                        complexity = self.analyze_query_complexity(query)
+                except Exception:
                     complexity = self.analyze_query_complexity(query)
-            except Exception:
-                complexity = self.analyze_query_complexity(query)
+                complexity_level = complexity
 
-            # 如果是简单问题，直接返回简化的结果，不进行分解
-            if complexity == "简单":
-                return {
-                    "original_query": query,
-                    "query_type": "事实性",
-                    "complexity_level": "简单",
-                    "sub_queries": [
-                        {
-                            "id": 1,
-                            "question": query,
-                            "importance": "高",
-                            "requires_external_info": True,
-                            "reasoning": "简单直接查询，模型建议走快速路径"
-                        }
-                    ],
-                    "key_entities": self.extract_key_entities(query),
-                    "verification_points": []
-                }
+                # 如果是简单问题，直接返回简化的结果，不进行分解
+                if complexity == "简单":
+                    return self._create_simple_decomposition(query), True
             
             # 准备聊天历史上下文
             conversation_context = self._format_conversation_history(conversation_history)
             
             # 构建针对复杂问题的提示
-            prompt = self.decomposition_prompt.format(
-                query=query, 
-                complexity=complexity,
-                conversation_context=conversation_context,
-                max_sub_queries=NORMAL_MAX_SUB_QUERIES
+            prompt = _render_decomposition_prompt(
+                self.decomposition_prompt, complexity, complexity_level, query, conversation_context
             )
             
             # 调用LLM进行问题拆解
-            async with httpx.AsyncClient() as client:
+            client = get_llm_httpx_client()
+            async with _llm_semaphore:
                 response = await client.post(
-                    f"{self.llm_service_url}/chat/completions",
-                    json={
+                    self._chat_url,
+                    headers=_JSON_HEADERS,
+                    content=_json_dumps({
                         "model": context.run_config.model if context else DEFAULT_SEARCH_MODEL,
                         "messages": [
-                            {
-                                "role": "system", 
-                                "content": "你是一个专业的问题分析专家，擅长将复杂问题分解为简单的子问题。请始终返回有效的JSON格式。"
-                            },
+                            self._DECOMPOSITION_SYSTEM_MSG,
                             {"role": "user", "content": prompt}
                         ],
-                    },
+                        "temperature": 0.0,
+                        **({"max_tokens": DECOMPOSITION_MAX_TOKENS} if DECOMPOSITION_MAX_TOKENS > 0 else {}),
+                    }),
                     timeout=LLM_DEFAULT_TIMEOUT
                 )
+            
+            if response.status_code != 200:
+                raise Exception(f"LLM请求失败: {response.status_code}")
+            
+            result = _json_loads(response.content)
+            content = result["choices"][0]["message"]["content"]
+            
+            # 尝试解析JSON
+            try:
+                # 清理 markdown 代码块标记
+                cleaned_content = self._clean_json_content(content)
+                decomposition = _json_loads(cleaned_content)
                 
-                if response.status_code != 200:
-                    raise Exception(f"LLM请求失败: {response.status_code}")
+                # 验证必要字段
+                missing = _REQUIRED_DECOMPOSITION_FIELDS - decomposition.keys()
+                if missing:
+                    raise ValueError(f"缺少必要字段: {sorted(missing)}")
                 
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
+                # 确保sub_queries是列表
+                if not isinstance(decomposition.get("sub_queries"), list):
+                    raise ValueError("sub_queries必须是列表")
+
+                # 合并模式下由模型判定为简单问题时，走与两步模式一致的快速结果
+                if decomposition.get("complexity_level") == "简单":
+                    return self._create_simple_decomposition(query), True
+
+                # 硬性数量上限裁剪：按重要性优先，稳定保序
+                sub_queries = decomposition.get("sub_queries", [])
+
+                def importance_rank(val: str) -> int:
+                    # 数值越小优先级越高
+                    mapping = {"高": 0, "中": 1, "低": 2}
+                    return mapping.get(str(val).strip(), 1)
+
+                # 创建带原始索引的列表以便稳定排序
+                indexed_items = []
+                for idx, item in enumerate(sub_queries):
+                    if isinstance(item, dict):
+                        imp = item.get("importance", "中")
+                    else:
+                        imp = "中"
+                    indexed_items.append((importance_rank(imp), idx, item))
+
+                # 按重要性升序，其次保持原始顺序
+                indexed_items.sort(key=lambda x: (x[0], x[1]))
+
+                # 裁剪到上限
+                trimmed = [it[2] for it in indexed_items[:NORMAL_MAX_SUB_QUERIES]]
+
+                # 若裁剪后为空，兜底保留原始问题
+                if not trimmed:
+                    trimmed = [{
+                        "id": 1,
+                        "question": query,
+                        "importance": "高",
+                        "requires_external_info": True,
+                        "reasoning": "裁剪后兜底保留原始问题"
+                    }]
+
+                decomposition["sub_queries"] = trimmed
+                return decomposition, True
                 
-                # 尝试解析JSON
+            except json.JSONDecodeError as e:
+                logger.warning("JSON解析失败: %s", e)
+                logger.debug("原内容: %s", content)
+                # 尝试修复截断的JSON；首尾已是完整对象的内容不是截断造成的，修复也无济于事
+                stripped = cleaned_content.strip()
+                if stripped.startswith('{') and stripped.endswith('}'):
+                    return self._create_fallback_decomposition(query), False
                 try:
-                    # 清理 markdown 代码块标记
-                    cleaned_content = self._clean_json_content(content)
-                    decomposition = json.loads(cleaned_content)
-                    
-                    # 验证必要字段
-                    if not all(key in decomposition for key in ["sub_queries", "query_type"]):
-                        raise ValueError("缺少必要字段")
-                    
-                    # 确保sub_queries是列表
-                    if not isinstance(decomposition.get("sub_queries"), list):
-                        raise ValueError("sub_queries必须是列表")
-
-                    # 硬性数量上限裁剪：按重要性优先，稳定保序
-                    sub_queries = decomposition.get("sub_queries", [])
-
-                    def importance_rank(val: str) -> int:
-                        # 数值越小优先级越高
-                        mapping = {"高": 0, "中": 1, "低": 2}
-                        return mapping.get(str(val).strip(), 1)
-
-                    # 创建带原始索引的列表以便稳定排序
-                    indexed_items = []
-                    for idx, item in enumerate(sub_queries):
-                        if isinstance(item, dict):
-                            imp = item.get("importance", "中")
-                        else:
-                            imp = "中"
-                        indexed_items.append((importance_rank(imp), idx, item))
-
-                    # 按重要性升序，其次保持原始顺序
-                    indexed_items.sort(key=lambda x: (x[0], x[1]))
-
-                    # 裁剪到上限
-                    trimmed = [it[2] for it in indexed_items[:NORMAL_MAX_SUB_QUERIES]]
-
-                    # 若裁剪后为空，兜底保留原始问题
-                    if not trimmed:
-                        trimmed = [{
-                            "id": 1,
-                            "question": query,
-                            "importance": "高",
-                            "requires_external_info": True,
-                            "reasoning": "裁剪后兜底保留原始问题"
-                        }]
-
-                    decomposition["sub_queries"] = trimmed
-                    return decomposition
-                    
-                except json.JSONDecodeError as e:
-                    print(f"JSON解析失败: {e}, 原内容: {content}")
-                    # 尝试修复截断的JSON
-                    try:
-                        repaired_content = self._repair_truncated_json(content)
-                        if repaired_content:
-                            decomposition = json.loads(repaired_content)
-                            print(f"JSON修复成功")
-
-                            # 同步应用硬性数量上限裁剪
-                            sub_queries = decomposition.get("sub_queries", [])
-
-                            def importance_rank(val: str) -> int:
-                                mapping = {"高": 0, "中": 1, "低": 2}
-                                return mapping.get(str(val).strip(), 1)
-
-                            indexed_items = []
-                            for idx, item in enumerate(sub_queries):
-                                if isinstance(item, dict):
-                                    imp = item.get("importance", "中")
-                                else:
-                                    imp = "中"
-                                indexed_items.append((importance_rank(imp), idx, item))
-
-                            indexed_items.sort(key=lambda x: (x[0], x[1]))
-                            trimmed = [it[2] for it in indexed_items[:NORMAL_MAX_SUB_QUERIES]]
-
-                            if not trimmed:
-                                trimmed = [{
-                                    "id": 1,
-                                    "question": query,
-                                    "importance": "高",
-                                    "requires_external_info": True,
-                                    "reasoning": "裁剪后兜底保留原始问题"
-                                }]
-
-                            decomposition["sub_queries"] = trimmed
-                            return decomposition
-                    except Exception as repair_e:
-                        print(f"JSON修复失败: {repair_e}")
-                    
-                    # 返回简化的拆解结果
-                    return self._create_fallback_decomposition(query)
-                    
+                    repaired_content = self._repair_truncated_json(content)
+                    if repaired_content:
+                        decomposition = _json_loads(repaired_content)
+                        logger.debug("JSON修复成功")
+
+                        if decomposition.get("complexity_level") == "简单":
+                            return self._create_simple_decomposition(query), True
+
+                        # 同步应用硬性数量上限裁剪
+                        sub_queries = decomposition.get("sub_queries", [])
+
+                        def importance_rank(val: str) -> int:
+                            mapping = {"高": 0, "中": 1, "低": 2}
+                            return mapping.get(str(val).strip(), 1)
+
+                        indexed_items = []
+                        for idx, item in enumerate(sub_queries):
+                            if isinstance(item, dict):
+                                imp = item.get("importance", "中")
+                            else:
+                                imp = "中"
+                            indexed_items.append((importance_rank(imp), idx, item))
+
+                        indexed_items.sort(key=lambda x: (x[0], x[1]))
+                        trimmed = [it[2] for it in indexed_items[:NORMAL_MAX_SUB_QUERIES]]
+
+                        if not trimmed:
+                            trimmed = [{
+                                "id": 1,
+                                "question": query,
+                                "importance": "高",
+                                "requires_external_info": True,
+                                "reasoning": "裁剪后兜底保留原始问题"
+                            }]
+
+                        decomposition["sub_queries"] = trimmed
+                        return decomposition, True
+                except Exception as repair_e:
+                    logger.warning("JSON修复失败: %s", repair_e)
+                
+                # 返回简化的拆解结果
+                return self._create_fallback_decomposition(query), False
+                
         except Exception as e:
-            print(f"问题拆解失败: {e}")
-            return self._create_fallback_decomposition(query)
+            logger.warning("问题拆解失败: %s", e)
+            return self._create_fallback_decomposition(query), False
+
+    def _create_simple_decomposition(self, query: str) -> Dict[str, Any]:
+        """
+        创建简单问题的拆解结果（不分解，原问题即唯一子问题）
+        """
+        return {
+            "original_query": query,
+            "query_type": "事实性",
+            "complexity_level": "简单",
+            "sub_queries": [
+                {
+                    "id": 1,
+                    "question": query,
+                    "importance": "高",
+                    "requires_external_info": True,
+                    "reasoning": "简单直接查询，模型建议走快速路径"
+                }
+            ],
+            "key_entities": self.extract_key_entities(query),
+            "verification_points": []
+        }
 
     def _create_fallback_decomposition(self, query: str) -> Dict[str, Any]:
         """
@@ -259,17 +636,19 @@ class QueryDecomposer:
         Returns:
             "简单"|"中等"|"复杂"
         """
-        # 简化的启发式规则，主要基于长度和结构
-        word_count = len(query.split())
-        question_marks = query.count('?') + query.count('？')
-        
-        # 基本的复杂度评估
-        if word_count <= 8 and question_marks <= 1:
-            return "简单"
-        elif word_count > 25 or question_marks > 1:
-            return "复杂"
-        else:
-            return "中等"
+        return _analyze_query_complexity(query)
+
+    def _obvious_simple(self, query: str) -> bool:
+        """
+        启发式判断是否为明显的简单问题（如"北京天气"）：
+        足够短、不含连接/比较词、至多一个问号。不确定时返回 False，交给 LLM 判断。
+        """
+        query = query.strip()
+        return (
+            0 < len(query) <= _OBVIOUS_SIMPLE_MAX_CHARS
+            and len(_QUESTION_MARK_RE.findall(query)) <= 1
+            and not _COMPOUND_QUERY_RE.search(query)
+        )
 
     def should_use_fast_route(self, query: str) -> bool:
         """
@@ -338,7 +717,7 @@ class QueryDecomposer:
             }
             
         except Exception as e:
-            print(f"路由判断失败: {e}")
+            logger.warning("路由判断失败: %s", e)
             # 保守策略：默认不使用快速路由，需要工具
             complexity = self.analyze_query_complexity(query)
             return {
@@ -353,29 +732,34 @@ class QueryDecomposer:
         query: str, 
         context: Optional[ToolExecutionContext] = None,
         conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        判断问题复杂度；并发的相同请求合并为一次 LLM 调用，各调用方拿到结果的独立副本。
+        """
+        model_name = (context.run_config.model if context else DEFAULT_SEARCH_MODEL)
+        key = self._resp_cache_key(query, model_name, conversation_history)
+        inflight = self._judge_inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(
+                self._judge_complexity_uncached(query, context, conversation_history)
+            )
+            self._judge_inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._judge_inflight.pop(key, None))
+        # shield：某个调用方被取消时不影响其他等待同一结果的调用方
+        result = await asyncio.shield(inflight)
+        return dict(result)
+
+    async def _judge_complexity_uncached(
+        self, 
+        query: str, 
+        context: Optional[ToolExecutionContext] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None
     ) -> Dict[str, Any]:
         """
         使用 LLM 判断问题复杂度、是否走快速路由以及是否需要外部工具。
         现在会考虑对话历史来识别续问和上下文相关的查询。
         返回形如 {"complexity": "简单|中等|复杂", "fast_route": bool, "needs_tools": bool, "reason": str}。
         """
-        system_prompt = (
-            "你是一个严格的问题分类器。只输出JSON且不包含额外文本。\n"
-            "请基于用户当前问题和对话历史来判断三个维度：\n"
-            "1. complexity（复杂度）：简单/中等/复杂\n"
-            "2. fast_route（快速路由）：是否可跳过复杂的问题拆解流程\n"
-            "3. needs_tools（需要工具）：是否需要调用外部工具（搜索、API等）获取信息\n\n"
-            
-            "判断标准：\n"
-            "- needs_tools=false：纯概念解释、定义、常识问答，基于已有知识即可回答\n"
-            "- needs_tools=true：需要实时信息、具体数据、最新资讯的查询\n"
-            "- fast_route=true：单一直接的问题，无需复杂推理\n"
-            "- fast_route=false：需要多步推理、多维度分析的复杂问题\n\n"
-            
-            '输出格式：{"complexity": "简单|中等|复杂", "fast_route": true/false, "needs_tools": true/false, "reason": "不超过50字"}。\n'
-            "无法确定时，将 fast_route 和 needs_tools 都设为 true，complexity 设为 中等。"
-        )
-        
         # 格式化对话历史
         history_context = self._format_conversation_history(conversation_history)
         
@@ -385,26 +769,35 @@ class QueryDecomposer:
             "请判断当前问题的处理方式。只输出JSON。"
         )
         model_name = (context.run_config.model if context else DEFAULT_SEARCH_MODEL)
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{self.llm_service_url}/chat/completions",
-                json={
-                    "model": model_name,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.0,
-                },
-                timeout=LLM_DEFAULT_TIMEOUT
-            )
+        payload = {
+            "model": model_name,
+            "messages": [
+                self._JUDGE_SYSTEM_MSG,
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.0,
+        }
+        # 优先请求结构化输出（约束解码保证 JSON 合法且输出更短）
+        use_schema = self._chat_url not in _STRUCTURED_OUTPUT_UNSUPPORTED
+        if use_schema:
+            payload["response_format"] = self._JUDGE_RESPONSE_FORMAT
+        post = functools.partial(
+            get_llm_httpx_client().post, self._chat_url, headers=_JSON_HEADERS, timeout=LLM_DEFAULT_TIMEOUT
+        )
+        async with _llm_semaphore:
+            resp = await post(content=_json_dumps(payload))
+            if use_schema and resp.status_code in (400, 422):
+                # 后端不支持 json_schema 时去掉 response_format 重试，并记住该后端
+                _STRUCTURED_OUTPUT_UNSUPPORTED.add(self._chat_url)
+                del payload["response_format"]
+                resp = await post(content=_json_dumps(payload))
         if resp.status_code != 200:
             return {"complexity": "中等", "fast_route": True, "needs_tools": True, "reason": "分类请求失败"}
-        data = resp.json()
+        data = _json_loads(resp.content)
         content = data["choices"][0]["message"]["content"]
         try:
             cleaned = self._clean_json_content(content)
-            parsed = json.loads(cleaned)
+            parsed = _json_loads(cleaned)
             complexity = parsed.get("complexity", "中等")
             fast_route = bool(parsed.get("fast_route", True))
             needs_tools = bool(parsed.get("needs_tools", True))
@@ -421,7 +814,7 @@ class QueryDecomposer:
                 "reason": reason
             }
         except Exception as e:
-            print(f"分类解析失败: {e}")
+            logger.warning("分类解析失败: %s", e)
             return {"complexity": "中等", "fast_route": True, "needs_tools": True, "reason": "分类解析失败"}
 
     def _format_conversation_history(self, conversation_history: Optional[List[Dict[str, str]]]) -> str:
@@ -465,21 +858,7 @@ class QueryDecomposer:
         提取问题中的关键实体（简单实现）
         """
         # 这里可以使用更复杂的NER，目前使用简单的关键词提取
-        import re
-        
-        # 提取可能的实体词
-        entities = []
-        
-        # 提取引号中的内容
-        quoted_text = re.findall(r'"([^"]*)"', query)
-        entities.extend(quoted_text)
-        
-        # 提取可能的专有名词（大写开头的词）
-        proper_nouns = re.findall(r'\b[A-Z][a-z]+\b', query)
-        entities.extend(proper_nouns)
-        
-        # 去重并返回
-        return list(set(entities))
+        return list(_extract_key_entities(query))
     
     def _clean_json_content(self, content: str) -> str:
         """
@@ -491,20 +870,7 @@ class QueryDecomposer:
         Returns:
             清理后的 JSON 字符串
         """
-        # 去除开头和结尾的空白字符
-        content = content.strip()
-        
-        # 移除 markdown 代码块标记
-        if content.startswith("```json"):
-            content = content[7:]  # 移除 "```json"
-        elif content.startswith("```"):
-            content = content[3:]   # 移除 "```"
-        
-        if content.endswith("```"):
-            content = content[:-3]  # 移除结尾的 "```"
-        
-        # 再次去除空白字符
-        return content.strip()
+        return strip_code_fence(content)
     
     def _repair_truncated_json(self, content: str) -> str:
         """
@@ -517,61 +883,7 @@ class QueryDecomposer:
             修复后的JSON字符串，如果无法修复则返回None
         """
         try:
-            # 清理内容
-            cleaned_content = self._clean_json_content(content)
-            
-            # 检查是否是未完成的JSON
-            if not cleaned_content.strip().endswith('}'):
-                # 尝试找到最后一个完整的字段
-                lines = cleaned_content.split('\n')
-                valid_lines = []
-                open_braces = 0
-                open_quotes = False
-                
-                for line in lines:
-                    # 简单的状态跟踪
-                    for char in line:
-                        if char == '"' and (not valid_lines or valid_lines[-1][-1] != '\\'):
-                            open_quotes = not open_quotes
-                        elif not open_quotes:
-                            if char == '{':
-                                open_braces += 1
-                            elif char == '}':
-                                open_braces -= 1
-                    
-                    # 如果这一行结束时处于安全状态，则保留
-                    if not open_quotes and (line.strip().endswith(',') or line.strip().endswith('}') or line.strip().endswith('{')):
-                        valid_lines.append(line)
-                    elif not open_quotes and not line.strip():
-                        valid_lines.append(line)  # 保留空行
-                    elif open_quotes:
-                        # 如果在引号内被截断，尝试补完
-                        if line.strip().endswith('",'):
-                            valid_lines.append(line)
-                        else:
-                            # 尝试补完这个字段
-                            fixed_line = line.strip()
-                            if not fixed_line.endswith('"'):
-                                fixed_line += '"'
-                            if not fixed_line.endswith(','):
-                                fixed_line += ','
-                            valid_lines.append('  ' + fixed_line)
-                            break
-                    else:
-                        valid_lines.append(line)
-                
-                # 确保JSON结构完整
-                reconstructed = '\n'.join(valid_lines)
-                
-                # 补完缺失的结构
-                while open_braces > 0:
-                    reconstructed += '\n}'
-                    open_braces -= 1
-                
-                return reconstructed
-            
-            return cleaned_content
-            
+            return repair_truncated_json(self._clean_json_content(content))
         except Exception as e:
-            print(f"修复JSON时出错: {e}")
+            logger.warning("修复JSON时出错: %s", e)
             return None
@@ -1,7 +1,11 @@
 """
 思考引擎 - 基于已有知识独立思考问题
 """
+import copy
 import json
+import time
+import hashlib
+from collections import Counter, OrderedDict
 from typing import List, Dict, Any, Optional
 from .models import ToolExecutionContext
 from ..config import (
@@ -26,6 +30,9 @@ from ..config import (
     LLM_DEFAULT_TIMEOUT,
     DEFAULT_SEARCH_MODEL,
     REASONING_TIMEOUT,
+    REASONING_CACHE_ENABLED,
+    REASONING_CACHE_MAX_SIZE,
+    REASONING_CACHE_TTL_SECONDS,
     WEB_SEARCH_LLM_TIMEOUT,
     PROXY_URL,
     HTTP_PROXY,
@@ -38,8 +45,24 @@ from .prompts import (
     BATCH_REASONING_SYSTEM_PROMPT,
     BATCH_REASONING_USER_PROMPT_TEMPLATE,
 )
+from ..utils.json_repair import repair_truncated_json, strip_code_fence
+from ..utils.search_keywords import QUESTION_PARTICLE_RE
 # 注意：避免顶层导入 chat_complete 以防循环依赖
 
+# LLM 返回的 JSON 解码：优先 orjson（其 JSONDecodeError 继承自 json.JSONDecodeError），
+# 未安装时回退到标准库
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# 批量思考用户提示模板预先按占位符切分，调用时直接拼接，避免每次 str.format 重新解析模板
+_BATCH_PROMPT_HEAD, _BATCH_PROMPT_REST = BATCH_REASONING_USER_PROMPT_TEMPLATE.split("{context}", 1)
+_BATCH_PROMPT_MID, _BATCH_PROMPT_TAIL = _BATCH_PROMPT_REST.split("{questions_json}", 1)
+
+# 批量思考结果缓存：ReasoningEngine 按请求创建，缓存放在模块级以便跨请求复用
+_THOUGHTS_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+
 
 class ReasoningEngine:
     """
@@ -105,24 +128,40 @@ class ReasoningEngine:
 
         # 构建提示
         system_prompt = BATCH_REASONING_SYSTEM_PROMPT
-        user_prompt = BATCH_REASONING_USER_PROMPT_TEMPLATE.format(
-            context=context_str,
-            questions_json=questions_json,
-        )
+        user_prompt = "".join((
+            _BATCH_PROMPT_HEAD, context_str,
+            _BATCH_PROMPT_MID, questions_json,
+            _BATCH_PROMPT_TAIL,
+        ))
+
+        model_name = execution_context.run_config.model if execution_context else DEFAULT_SEARCH_MODEL
+
+        # 相同模型、上下文、子问题与聊天历史的思考结果直接复用
+        cache_key = None
+        if REASONING_CACHE_ENABLED and REASONING_CACHE_MAX_SIZE > 0:
+            cache_key = self._thoughts_cache_key(model_name, user_prompt, conversation_history)
+            entry = _THOUGHTS_CACHE.get(cache_key)
+            if entry is not None:
+                cached_at, cached = entry
+                if time.monotonic() - cached_at <= REASONING_CACHE_TTL_SECONDS:
+                    _THOUGHTS_CACHE.move_to_end(cache_key)
+                    print(f"[ReasoningEngine] 思考结果缓存命中: {len(cached)} 条")
+                    return copy.deepcopy(cached)
+                del _THOUGHTS_CACHE[cache_key]
 
         # 调用统一 LLM 客户端
         from ..llm_client import chat_complete as _chat_complete
         content = await _chat_complete(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
-            model=execution_context.run_config.model if execution_context else DEFAULT_SEARCH_MODEL,
+            model=model_name,
             timeout=REASONING_TIMEOUT,
             conversation_history=conversation_history,
         )
 
         # 解析结果
         cleaned = self._clean_json_content(content)
-        parsed = json.loads(cleaned)
+        parsed = _json_loads(cleaned)
         results = parsed.get("results", []) if isinstance(parsed, dict) else []
         thoughts: List[Dict[str, Any]] = []
         for item in results:
@@ -139,8 +178,26 @@ class ReasoningEngine:
             }
             thoughts.append(thought)
 
+        # 空结果可能是模型输出异常，不缓存
+        if cache_key is not None and thoughts:
+            _THOUGHTS_CACHE[cache_key] = (time.monotonic(), copy.deepcopy(thoughts))
+            _THOUGHTS_CACHE.move_to_end(cache_key)
+            while len(_THOUGHTS_CACHE) > REASONING_CACHE_MAX_SIZE:
+                _THOUGHTS_CACHE.popitem(last=False)
+
         return thoughts
 
+    @staticmethod
+    def _thoughts_cache_key(
+        model: str,
+        user_prompt: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+    ) -> str:
+        """生成思考缓存键：模型 + 用户提示（含上下文与子问题）+ 聊天历史"""
+        history = json.dumps(conversation_history or [], ensure_ascii=False)
+        raw = f"{model}|{user_prompt}|{history}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
     async def _create_fallback_thinking(self, question: str, context: Any, execution_context: Optional[ToolExecutionContext] = None) -> Dict[str, Any]:
         """
         创建回退的思考结果（通过 LLM 判定是否属于实时信息查询）
@@ -214,7 +271,7 @@ class ReasoningEngine:
             try:
                 # 复用清理逻辑，剥离可能的代码围栏
                 cleaned = self._clean_json_content(content)
-                parsed = json.loads(cleaned)
+                parsed = _json_loads(cleaned)
                 needs = bool(parsed.get("needs_realtime", False))
                 reason = parsed.get("reason", "")
                 return {"needs_realtime": needs, "reason": reason}
@@ -237,14 +294,12 @@ class ReasoningEngine:
         if not thoughts:
             return "低"
         
-        confidence_levels = [thought.get("confidence_level", "低") for thought in thoughts]
+        # 统计置信度分布（单次遍历）
+        counts = Counter(thought.get("confidence_level", "低") for thought in thoughts)
+        high_count = counts["高"]
+        medium_count = counts["中"]
         
-        # 统计置信度分布
-        high_count = confidence_levels.count("高")
-        medium_count = confidence_levels.count("中")
-        low_count = confidence_levels.count("低")
-        
-        total = len(confidence_levels)
+        total = len(thoughts)
         
         # 基于分布决定整体置信度
         if high_count / total >= 0.7:
@@ -264,25 +319,21 @@ class ReasoningEngine:
         Returns:
             合并和去重后的知识缺口列表
         """
-        all_gaps = []
-        seen_descriptions = set()
-        
+        # 按描述去重，dict 保持首次出现的顺序
+        unique_gaps: Dict[str, Dict[str, Any]] = {}
         for thought in thoughts:
-            gaps = thought.get("knowledge_gaps", [])
-            for gap in gaps:
+            for gap in thought.get("knowledge_gaps", []):
                 gap_desc = gap.get("gap_description", "")
-                if gap_desc and gap_desc not in seen_descriptions:
-                    seen_descriptions.add(gap_desc)
-                    all_gaps.append(gap)
+                if gap_desc and gap_desc not in unique_gaps:
+                    unique_gaps[gap_desc] = gap
         
-        # 按重要性排序
-        importance_order = {"高": 3, "中": 2, "低": 1}
-        all_gaps.sort(
-            key=lambda x: importance_order.get(x.get("importance", "低"), 1),
-            reverse=True
-        )
-        
-        return all_gaps
+        # 按重要性排序（稳定，同级保持原顺序）
+        importance_rank = {"高": 3, "中": 2, "低": 1}.get
+
+        def sort_key(gap: Dict[str, Any]) -> int:
+            return importance_rank(gap.get("importance", "低"), 1)
+
+        return sorted(unique_gaps.values(), key=sort_key, reverse=True)
 
     def generate_preliminary_answer(self, thoughts: List[Dict[str, Any]]) -> str:
         """
@@ -318,20 +369,7 @@ class ReasoningEngine:
         Returns:
             清理后的 JSON 字符串
         """
-        # 去除开头和结尾的空白字符
-        content = content.strip()
-        
-        # 移除 markdown 代码块标记
-        if content.startswith("```json"):
-            content = content[7:]  # 移除 "```json"
-        elif content.startswith("```"):
-            content = content[3:]   # 移除 "```"
-        
-        if content.endswith("```"):
-            content = content[:-3]  # 移除结尾的 "```"
-        
-        # 再次去除空白字符
-        return content.strip()
+        return strip_code_fence(content)
     
     def _repair_truncated_json(self, content: str) -> str:
         """
@@ -344,61 +382,7 @@ class ReasoningEngine:
             修复后的JSON字符串，如果无法修复则返回None
         """
         try:
-            # 清理内容
-            cleaned_content = self._clean_json_content(content)
-            
-            # 检查是否是未完成的JSON
-            if not cleaned_content.strip().endswith('}'):
-                # 尝试找到最后一个完整的字段
-                lines = cleaned_content.split('\n')
-                valid_lines = []
-                open_braces = 0
-                open_quotes = False
-                
-                for line in lines:
-                    # 简单的状态跟踪
-                    for char in line:
-                        if char == '"' and (not valid_lines or valid_lines[-1][-1] != '\\'):
-                            open_quotes = not open_quotes
-                        elif not open_quotes:
-                            if char == '{':
-                                open_braces += 1
-                            elif char == '}':
-                                open_braces -= 1
-                    
-                    # 如果这一行结束时处于安全状态，则保留
-                    if not open_quotes and (line.strip().endswith(',') or line.strip().endswith('}') or line.strip().endswith('{')):
-                        valid_lines.append(line)
-                    elif not open_quotes and not line.strip():
-                        valid_lines.append(line)  # 保留空行
-                    elif open_quotes:
-                        # 如果在引号内被截断，尝试补完
-                        if line.strip().endswith('",'):
-                            valid_lines.append(line)
-                        else:
-                            # 尝试补完这个字段
-                            fixed_line = line.strip()
-                            if not fixed_line.endswith('"'):
-                                fixed_line += '"'
-                            if not fixed_line.endswith(','):
-                                fixed_line += ','
-                            valid_lines.append('  ' + fixed_line)
-                            break
-                    else:
-                        valid_lines.append(line)
-                
-                # 确保JSON结构完整
-                reconstructed = '\n'.join(valid_lines)
-                
-                # 补完缺失的结构
-                while open_braces > 0:
-                    reconstructed += '\n}'
-                    open_braces -= 1
-                
-                return reconstructed
-            
-            return cleaned_content
-            
+            return repair_truncated_json(self._clean_json_content(content))
         except Exception as e:
             print(f"修复JSON时出错: {e}")
             return None
@@ -413,10 +397,8 @@ class ReasoningEngine:
         Returns:
             优化后的搜索关键词列表
         """
-        import re
-        
         # 移除问号和语气词
-        cleaned_question = re.sub(r'[？?吗呢啊]', '', question)
+        cleaned_question = QUESTION_PARTICLE_RE.sub('', question)
         
         keywords = [cleaned_question]
         
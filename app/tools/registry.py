@@ -1,10 +1,16 @@
 """工具注册表"""
-from typing import Dict, List, Optional, Any, Callable, TYPE_CHECKING
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Any, Callable, Tuple, TYPE_CHECKING
 import asyncio
+import json
+import logging
 import time
 import random
+import hashlib
+import functools
+from collections import OrderedDict
 from .models import ToolSchema, ToolCall, ToolResult, ToolMetadata
 from .parsers import ToolCallValidator
+from ..utils.async_timeout import await_with_timeout
 # 错误处理已简化，使用标准Python异常
 # 缓存功能已简化
 # 可观测性功能已简化
@@ -12,18 +18,73 @@ from .parsers import ToolCallValidator
 if TYPE_CHECKING:
     from .models import ToolExecutionContext
 
+logger = logging.getLogger(__name__)
+
+# 参数校验失败结果的负缓存：同样的非法参数在 TTL 内直接拒绝，不再走清理与 Schema 校验
+_NEG_CACHE_MAX_SIZE = 1024
+_NEG_CACHE_TTL_SECONDS = 60.0
+
+# 断路器：连续失败阈值、首次打开时长与最长打开时长（秒）；状态为 关闭 → 打开 → 半开（单个探测请求）
+_CB_FAILURE_THRESHOLD = 3
+_CB_BASE_OPEN_S = 30.0
+_CB_MAX_OPEN_S = 300.0
+_CB_CLOSED = "closed"
+_CB_OPEN = "open"
+_CB_HALF_OPEN = "half_open"
+
+# 重试退避参数（秒）
+_BACKOFF_BASE_S = 0.2
+_BACKOFF_CAP_S = 10.0
+
+# 工具参数规范化序列化：优先 orjson 排序键输出，未安装时回退到标准库
+def _canonical_json_std(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+
+
+try:
+    import orjson
+
+    def _canonical_json(value: Any) -> bytes:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson 不支持超过 64 位的整数（json.loads 解析模型输出时可能产生），回退到标准库
+            return _canonical_json_std(value)
+except ImportError:
+    _canonical_json = _canonical_json_std
+
+
+def args_digest(value: Any) -> str:
+    """工具参数的规范化摘要（键排序后序列化再做 blake2b），用作各类缓存键"""
+    return hashlib.blake2b(_canonical_json(value), digest_size=16).hexdigest()
+
+
+class _RunParams(NamedTuple):
+    """工具的默认运行参数，注册时由元数据计算一次"""
+    timeout_s: float
+    max_retries: int
+    semaphore: asyncio.Semaphore
+    meta: ToolMetadata
+
 
 class ToolRegistry:
     """工具注册表，管理可用工具的注册、查找和执行"""
     
     def __init__(self):
         self._tools: Dict[str, ToolSchema] = {}
-        self._handlers: Dict[str, Callable] = {}
+        # 处理函数及其调用信息（是否为协程函数、位置参数名集合），在注册时计算一次，避免每次调用都做反射
+        self._handlers: Dict[str, Tuple[Callable, bool, Optional[FrozenSet[str]]]] = {}
         self._metadata: Dict[str, ToolMetadata] = {}
         self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._run_params: Dict[str, _RunParams] = {}
+        # 幂等工具正在执行中的调用：相同调用键的并发请求等待同一个任务
+        self._inflight: Dict[Tuple[str, str, float, int], "asyncio.Future[ToolResult]"] = {}
+        # 参数校验失败的负缓存：(工具名, 参数摘要) -> (写入时间, 错误信息)
+        self._neg_cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
         # 简单断路器：当连续失败次数超过阈值时短时间拒绝请求
         self._cb_failures: Dict[str, int] = {}
         self._cb_open_until: Dict[str, float] = {}
+        self._cb_state: Dict[str, str] = {}
     
     def register_tool(self, schema: ToolSchema, handler: Callable, metadata: Optional[ToolMetadata] = None):
         """注册工具
@@ -34,11 +95,29 @@ class ToolRegistry:
             metadata: 工具运行元数据（超时、重试、并发等）
         """
         self._tools[schema.name] = schema
-        self._handlers[schema.name] = handler
+        # 注册时预编译参数 Schema，执行时的校验直接复用编译结果
+        try:
+            ToolCallValidator.compile_schema(schema.parameters)
+        except Exception as e:
+            logger.warning("[Registry] 工具参数 Schema 预编译失败: %s, 错误: %s", schema.name, e)
+        code = getattr(handler, '__code__', None)
+        param_names = frozenset(code.co_varnames[:code.co_argcount]) if code is not None else None
+        is_async = asyncio.iscoroutinefunction(handler)
+        self._handlers[schema.name] = (handler, is_async, param_names)
         meta = metadata or ToolMetadata()
         self._metadata[schema.name] = meta
         # 为每个工具创建并发限流器
-        self._semaphores[schema.name] = asyncio.Semaphore(max(1, meta.max_concurrency))
+        semaphore = asyncio.Semaphore(max(1, meta.max_concurrency))
+        self._semaphores[schema.name] = semaphore
+        self._run_params[schema.name] = _RunParams(meta.timeout_s, meta.max_retries, semaphore, meta)
+        # 断路器状态预置，执行时可直接按工具名索引
+        self._cb_failures[schema.name] = 0
+        self._cb_open_until[schema.name] = 0.0
+        self._cb_state[schema.name] = _CB_CLOSED
+
+    def get_tool_metadata(self, name: str) -> Optional[ToolMetadata]:
+        """获取工具运行元数据"""
+        return self._metadata.get(name)
 
     def get_tool_schema(self, name: str) -> Optional[ToolSchema]:
         """获取工具 Schema"""
@@ -56,65 +135,110 @@ class ToolRegistry:
         """检查是否有可用工具"""
         return len(self._tools) > 0
     
+    @staticmethod
+    def call_key(tool_call: ToolCall, context: Optional['ToolExecutionContext'] = None) -> Tuple[str, str]:
+        """生成调用标识键：工具名 + 参数与会被自动注入的上下文参数（模型、简单查询标志）的摘要
+        
+        注入参数会改变处理函数的实际输入，结果缓存与并发合并都必须按此区分调用。
+        """
+        injected = (context.run_config.model, context.is_simple_query) if context else None
+        return tool_call.name, args_digest([tool_call.arguments or {}, injected])
+
+    @staticmethod
+    def _effective_run_limits(
+        name: str,
+        run_params: _RunParams,
+        context: Optional['ToolExecutionContext'] = None,
+    ) -> Tuple[float, int]:
+        """本次调用生效的 (超时, 重试次数)：注册时的默认值，按上下文覆盖"""
+        timeout_s = run_params.timeout_s
+        max_retries = run_params.max_retries
+        # 上下文覆盖元数据（RunConfig 已由 pydantic 校验类型，只在配置了对应工具时才读取）
+        if context:
+            tool_timeouts = context.run_config.tool_timeouts
+            if tool_timeouts:
+                timeout_s = tool_timeouts.get(name, timeout_s)
+            tool_max_retries = context.run_config.tool_max_retries
+            if tool_max_retries:
+                max_retries = tool_max_retries.get(name, max_retries)
+        return timeout_s, max_retries
+
     async def execute_tool(self, tool_call: ToolCall, context: Optional['ToolExecutionContext'] = None) -> ToolResult:
         """执行工具调用
         
+        幂等工具的并发相同调用只执行一次，各调用方拿到带有自己 call_id 的结果。
+        
         Args:
             tool_call: 工具调用请求
             
         Returns:
             工具执行结果
         """
-        print(f"[Registry] 收到工具调用请求: {tool_call.name}, 参数: {tool_call.arguments}, call_id: {tool_call.call_id}")
+        run_params = self._run_params.get(tool_call.name)
+        if run_params is None or not run_params.meta.idempotent:
+            return await self._execute_tool_uncached(tool_call, context)
         
-        if not self.is_allowed(tool_call.name):
-            print(f"[Registry] 工具未找到或不允许: {tool_call.name}")
-            # 记录被拒绝的工具调用
-            print(f"[Registry] 工具调用被拒绝: {tool_call.name}")
-            return ToolResult(
-                name=tool_call.name,
-                result=f"工具 '{tool_call.name}' 不在允许列表中",
-                success=False,
-                error="Tool not allowed",
-                call_id=tool_call.call_id
-            )
+        # 合并键额外包含本次生效的超时与重试次数：上下文覆盖不同的调用不合并，各自按自己的配置执行
+        timeout_s, max_retries = self._effective_run_limits(tool_call.name, run_params, context)
+        key = (*self.call_key(tool_call, context), timeout_s, max_retries)
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._execute_tool_uncached(tool_call, context))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug("[Registry] 合并并发的相同工具调用: %s", tool_call.name)
+        # shield：某个调用方被取消时不影响其他等待同一结果的调用方
+        result = await asyncio.shield(inflight)
+        if result.call_id == tool_call.call_id:
+            return result
+        return result.model_copy(update={"call_id": tool_call.call_id})
+
+    async def _execute_tool_uncached(self, tool_call: ToolCall, context: Optional['ToolExecutionContext'] = None) -> ToolResult:
+        """执行工具调用（不经过并发合并）"""
+        logger.debug("[Registry] 收到工具调用请求: %s, 参数: %s, call_id: %s", tool_call.name, tool_call.arguments, tool_call.call_id)
+        # 各失败分支共用的结果构造（预先绑定工具名、call_id 与失败标志）
+        fail = functools.partial(ToolResult, name=tool_call.name, success=False, call_id=tool_call.call_id)
         
-        # 缓存功能已简化直接执行工具
-        meta = self._metadata.get(tool_call.name) or ToolMetadata()
+        # 一次查找同时判断“是否注册”与“是否有处理函数”：注册时 schema 与处理函数总是成对写入
+        entry = self._handlers.get(tool_call.name)
+        if entry is None:
+            # 记录被拒绝的工具调用
+            logger.warning("[Registry] 工具未找到或不允许，调用被拒绝: %s", tool_call.name)
+            return fail(result=f"工具 '{tool_call.name}' 不在允许列表中", error="Tool not allowed")
         
-        handler = self._handlers.get(tool_call.name)
+        handler, is_async, param_names = entry
         if not handler:
-            print(f"[Registry] 未找到工具处理函数: {tool_call.name}")
-            return ToolResult(
-                name=tool_call.name,
-                result=f"工具 '{tool_call.name}' 没有对应的执行函数",
-                success=False,
-                error="Handler not found",
-                call_id=tool_call.call_id
-            )
-        meta = self._metadata.get(tool_call.name) or ToolMetadata()
-        # 上下文覆盖元数据
-        timeout_s = meta.timeout_s
-        max_retries = meta.max_retries
-        if context:
-            try:
-                if context.run_config.tool_timeouts and tool_call.name in context.run_config.tool_timeouts:
-                    timeout_s = float(context.run_config.tool_timeouts[tool_call.name])
-                if context.run_config.tool_max_retries and tool_call.name in context.run_config.tool_max_retries:
-                    max_retries = int(context.run_config.tool_max_retries[tool_call.name])
-            except Exception:
-                pass
+            logger.warning("[Registry] 未找到工具处理函数: %s", tool_call.name)
+            return fail(result=f"工具 '{tool_call.name}' 没有对应的执行函数", error="Handler not found")
+        run_params = self._run_params[tool_call.name]
+        semaphore = run_params.semaphore
+        timeout_s, max_retries = self._effective_run_limits(tool_call.name, run_params, context)
 
-        semaphore = self._semaphores.get(tool_call.name) or asyncio.Semaphore(meta.max_concurrency)
+        # 参数校验只取决于工具名与原始参数，近期校验失败过的相同参数直接返回失败结果；
+        # 摘要只在负缓存非空时计算，正常调用不承担序列化与哈希开销
+        neg_key = None
+        if self._neg_cache:
+            neg_key = (tool_call.name, args_digest(tool_call.arguments or {}))
+            neg_entry = self._neg_cache.get(neg_key)
+            if neg_entry is not None:
+                cached_at, error_message = neg_entry
+                if time.monotonic() - cached_at <= _NEG_CACHE_TTL_SECONDS:
+                    logger.debug("[Registry] 参数校验失败缓存命中: %s", tool_call.name)
+                    return fail(result=f"工具执行出错：{error_message}", error=error_message, latency_ms=0.0, retries=0)
+                del self._neg_cache[neg_key]
+
+        schema = self._tools.get(tool_call.name)
+        schema_has_required = bool(schema.parameters.get("required")) if schema else False
 
         async def _invoke_once() -> Any:
-            # 准备工具函数参数
-            tool_args = dict(tool_call.arguments)
-            # 参数清理与校验（双保险）
-            schema = self.get_tool_schema(tool_call.name)
-            if schema:
+            # 准备工具函数参数：清理会生成新字典，注入参数时再合并出新字典，原始参数不做复制也不被修改
+            tool_args = tool_call.arguments
+            # 参数清理与校验（双保险）；无参数且 Schema 无必需字段时无需校验
+            if schema and (tool_args or schema_has_required):
                 try:
-                    tool_args = ToolCallValidator.sanitize_arguments(tool_args)
+                    if tool_args:
+                        tool_args = ToolCallValidator.sanitize_arguments(tool_args)
                     ok, err = ToolCallValidator.validate_json_schema(tool_args, schema.parameters)
                     if not ok:
                         # 参数验证失败是不可重试的错误，直接抛出特殊异常
@@ -126,111 +250,131 @@ class ToolRegistry:
                     # 其他验证异常也不应重试
                     raise ve
             # 自动注入模型参数和简单查询标志
-            if context and hasattr(handler, '__code__'):
-                param_names = handler.__code__.co_varnames[:handler.__code__.co_argcount]
+            if context and param_names is not None:
+                injected: Dict[str, Any] = {}
                 if 'model' in param_names and 'model' not in tool_args:
                     if context.run_config.model:
-                        tool_args['model'] = context.run_config.model
-                        print(f"[Registry] 自动传递模型参数: {context.run_config.model}")
+                        injected['model'] = context.run_config.model
+                        logger.debug("[Registry] 自动传递模型参数: %s", context.run_config.model)
                 
                 # 为 web_search 工具自动注入简单查询标志
                 if tool_call.name == 'web_search' and 'is_simple_query' in param_names and 'is_simple_query' not in tool_args:
-                    tool_args['is_simple_query'] = context.is_simple_query
-                    print(f"[Registry] 自动传递简单查询标志: {context.is_simple_query}")
+                    injected['is_simple_query'] = context.is_simple_query
+                    logger.debug("[Registry] 自动传递简单查询标志: %s", context.is_simple_query)
+                if injected:
+                    tool_args = {**tool_args, **injected}
             # 执行工具函数
-            if asyncio.iscoroutinefunction(handler):
+            if is_async:
                 return await handler(**tool_args)
             return handler(**tool_args)
 
         # 重试与超时
         attempt = 0
-        start = time.perf_counter()
+        # 热路径上将模块函数绑定为局部变量，减少重试循环中的全局与属性查找
+        monotonic = time.monotonic
+        uniform = random.uniform
+        sleep = asyncio.sleep
+        start = monotonic()
         last_error: Optional[Exception] = None
+        validation_failed = False
+        backoff = _BACKOFF_BASE_S
         async with semaphore:
-            # 断路器：检查是否打开
-            import time as _time
-            now = _time.monotonic()
-            if tool_call.name in self._cb_open_until and now < self._cb_open_until[tool_call.name]:
-                return ToolResult(
-                        name=tool_call.name,
-                        result=f"工具临时不可用（断路器打开）",
-                        success=False,
-                        error="circuit_open",
-                        call_id=tool_call.call_id,
-                        latency_ms=0.0,
-                        retries=attempt,
-                    )
-            while attempt <= max_retries:
-                try:
-                    print(f"[Registry] 开始执行工具处理函数: {tool_call.name}, 尝试 {attempt+1}/{max_retries+1}, 超时 {timeout_s}s")
-                    if timeout_s and timeout_s > 0:
-                        result = await asyncio.wait_for(_invoke_once(), timeout=timeout_s)
-                    else:
-                        result = await _invoke_once()
-                    latency_ms = (time.perf_counter() - start) * 1000.0
-                    print(f"[Registry] 工具执行成功: {tool_call.name}, 用时 {latency_ms:.1f}ms, 结果长度: {len(str(result)) if result else 0}")
-                    # 重置断路器计数
-                    self._cb_failures[tool_call.name] = 0
+            # 断路器：打开期间直接拒绝；冷却期过后进入半开状态，只放行一个探测请求
+            now = monotonic()
+            cb_state = self._cb_state[tool_call.name]
+            if cb_state != _CB_CLOSED:
+                if cb_state == _CB_HALF_OPEN or now < self._cb_open_until[tool_call.name]:
+                    return fail(result="工具临时不可用（断路器打开）", error="circuit_open", latency_ms=0.0, retries=attempt)
+                self._cb_state[tool_call.name] = _CB_HALF_OPEN
+            try:
+                while attempt <= max_retries:
+                    try:
+                        logger.debug("[Registry] 开始执行工具处理函数: %s, 尝试 %d/%d, 超时 %ss", tool_call.name, attempt + 1, max_retries + 1, timeout_s)
+                        # 3.11+ 用 asyncio.timeout 直接作用于当前任务，无需像 wait_for 那样额外创建 Task
+                        result = await await_with_timeout(
+                            _invoke_once(), timeout_s if timeout_s and timeout_s > 0 else None
+                        )
+                        latency_ms = (monotonic() - start) * 1000.0
+                        # 结果可能很大（网页搜索结果可达数百KB），仅在调试日志开启时计算长度，且不做 str() 转换
+                        if logger.isEnabledFor(logging.DEBUG):
+                            result_len = len(result) if isinstance(result, (str, bytes, list, dict)) else -1
+                            logger.debug("[Registry] 工具执行成功: %s, 用时 %.1fms, 结果长度: %d", tool_call.name, latency_ms, result_len)
+                        # 重置断路器（半开探测成功时恢复关闭）
+                        self._cb_failures[tool_call.name] = 0
+                        self._cb_state[tool_call.name] = _CB_CLOSED
                     
-                    tool_result = ToolResult(
-                        name=tool_call.name,
-                        result=result,
-                        success=True,
-                        call_id=tool_call.call_id,
-                        latency_ms=latency_ms,
-                        retries=attempt,
-                    )
+                        tool_result = ToolResult(
+                            name=tool_call.name,
+                            result=result,
+                            success=True,
+                            call_id=tool_call.call_id,
+                            latency_ms=latency_ms,
+                            retries=attempt,
+                        )
                     
-                    # 缓存功能已简化
+                        # 缓存功能已简化
                     
-                    return tool_result
-                except asyncio.TimeoutError as e:
-                    last_error = e
-                    print(f"[Registry] 工具超时: {tool_call.name} after {timeout_s}s (尝试 {attempt+1})")
-                except ValueError as e:
-                    # 参数验证失败等不可重试的错误，立即返回
-                    if "参数验证失败" in str(e):
+                        return tool_result
+                    except asyncio.TimeoutError as e:
                         last_error = e
-                        print(f"[Registry] 工具执行异常: {tool_call.name}, 错误: {str(e)} (尝试 {attempt+1})")
-                        break  # 立即跳出重试循环
-                    else:
+                        logger.warning("[Registry] 工具超时: %s after %ss (尝试 %d)", tool_call.name, timeout_s, attempt + 1)
+                    except ValueError as e:
+                        # 参数验证失败等不可重试的错误，立即返回
+                        if "参数验证失败" in str(e):
+                            last_error = e
+                            validation_failed = True
+                            logger.warning("[Registry] 工具执行异常: %s, 错误: %s (尝试 %d)", tool_call.name, e, attempt + 1)
+                            break  # 立即跳出重试循环
+                        else:
+                            last_error = e
+                            logger.warning("[Registry] 工具执行异常: %s, 错误: %s (尝试 %d)", tool_call.name, e, attempt + 1)
+                    except Exception as e:
                         last_error = e
-                        print(f"[Registry] 工具执行异常: {tool_call.name}, 错误: {str(e)} (尝试 {attempt+1})")
-                except Exception as e:
-                    last_error = e
-                    print(f"[Registry] 工具执行异常: {tool_call.name}, 错误: {str(e)} (尝试 {attempt+1})")
-                attempt += 1
-                if attempt <= max_retries and last_error and "参数验证失败" not in str(last_error):
-                    # 只有非参数验证错误才进行重试等待
-                    # 指数退避 + 抖动
-                    backoff = min(1.5 ** attempt, 10.0) * (0.5 + random.random())
-                    try:
-                        await asyncio.sleep(backoff)
-                    except Exception:
-                        pass
-
-        latency_ms = (time.perf_counter() - start) * 1000.0
-        # 打开断路器：连续失败计数+窗口
-        self._cb_failures[tool_call.name] = self._cb_failures.get(tool_call.name, 0) + 1
-        if self._cb_failures[tool_call.name] >= 3:
-            open_seconds = min(30.0 * self._cb_failures[tool_call.name], 300.0)
-            import time as _time
-            self._cb_open_until[tool_call.name] = _time.monotonic() + open_seconds
-            print(f"[Registry] 断路器打开: {tool_call.name} {open_seconds:.0f}s")
+                        logger.warning("[Registry] 工具执行异常: %s, 错误: %s (尝试 %d)", tool_call.name, e, attempt + 1)
+                    attempt += 1
+                    if attempt <= max_retries and last_error and "参数验证失败" not in str(last_error):
+                        # 只有非参数验证错误才进行重试等待
+                        # 去相关抖动退避：在 [基准, 上次等待×3] 内随机，并以上限截断
+                        backoff = min(_BACKOFF_CAP_S, uniform(_BACKOFF_BASE_S, backoff * 3.0))
+                        try:
+                            await sleep(backoff)
+                        except Exception:
+                            pass
+            except BaseException:
+                # 半开探测被取消时退回打开状态（冷却期已过），由下一个请求重新探测
+                if self._cb_state[tool_call.name] == _CB_HALF_OPEN:
+                    self._cb_state[tool_call.name] = _CB_OPEN
+                raise
+
+        end = monotonic()
+        latency_ms = (end - start) * 1000.0
+        # 打开断路器：连续失败达到阈值（或半开探测失败）后打开，冷却时间按失败次数指数增长
+        failures = self._cb_failures[tool_call.name] + 1
+        self._cb_failures[tool_call.name] = failures
+        if failures >= _CB_FAILURE_THRESHOLD:
+            exponent = min(failures - _CB_FAILURE_THRESHOLD, 8)
+            open_seconds = min(_CB_BASE_OPEN_S * (2 ** exponent), _CB_MAX_OPEN_S)
+            self._cb_open_until[tool_call.name] = end + open_seconds
+            self._cb_state[tool_call.name] = _CB_OPEN
+            logger.warning("[Registry] 断路器打开: %s %.0fs", tool_call.name, open_seconds)
         
         # 简化错误处理
         if last_error:
-            print(f"[Registry] 工具执行错误处理: {tool_call.name} - {str(last_error)}")
+            logger.warning("[Registry] 工具执行错误处理: %s - %s", tool_call.name, last_error)
             error_message = str(last_error)
+            if validation_failed:
+                if neg_key is None:
+                    neg_key = (tool_call.name, args_digest(tool_call.arguments or {}))
+                self._neg_cache[neg_key] = (end, error_message)
+                self._neg_cache.move_to_end(neg_key)
+                while len(self._neg_cache) > _NEG_CACHE_MAX_SIZE:
+                    self._neg_cache.popitem(last=False)
         else:
             error_message = '未知错误'
         
-        return ToolResult(
-            name=tool_call.name,
+        return fail(
             result=f"工具执行出错：{error_message}",
-            success=False,
             error=str(last_error) if last_error else 'Unknown',
-            call_id=tool_call.call_id,
             latency_ms=latency_ms,
             retries=attempt,
         )
@@ -240,6 +384,34 @@ class ToolRegistry:
 tool_registry = ToolRegistry()
 
 
+# Web 搜索工具的参数 Schema（模块级常量，注册时复用）
+_WEB_SEARCH_PARAMETERS: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "query": {
+            "type": "string",
+            "description": "搜索查询内容，可以是问题、关键词或主题"
+        },
+        "filter_list": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "域名过滤列表，包含需要从搜索结果中排除的域名。例如：['example.com', 'badsite.org']"
+        },
+        "model": {
+            "type": "string",
+            "description": "用于关键词生成的LLM模型名称，默认使用系统配置。传入此参数可覆盖系统默认模型",
+            "default": ""
+        },
+        "is_simple_query": {
+            "type": "boolean",
+            "description": "是否为简单查询模式，简单查询会使用更保守的关键词数量和结果数量配置",
+            "default": False
+        }
+    },
+    "required": ["query"]
+}
+
+
 # 注册 Web 搜索工具
 def register_web_search_tool():
     """注册 Web 搜索工具"""
@@ -248,46 +420,31 @@ def register_web_search_tool():
     web_search_schema = ToolSchema(
         name="web_search",
         description="搜索网络信息并进行智能召回。能够生成搜索关键词，从网络搜索相关内容，爬取网页，进行文档切分、向量化索引，并基于用户查询召回最相关的内容片段。",
-        parameters={
-            "type": "object",
-            "properties": {
-                "query": {
-                    "type": "string",
-                    "description": "搜索查询内容，可以是问题、关键词或主题"
-                },
-                "filter_list": {
-                    "type": "array",
-                    "items": {"type": "string"},
-                    "description": "域名过滤列表，包含需要从搜索结果中排除的域名。例如：['example.com', 'badsite.org']"
-                },
-                "model": {
-                    "type": "string",
-                    "description": "用于关键词生成的LLM模型名称，默认使用系统配置。传入此参数可覆盖系统默认模型",
-                    "default": ""
-                },
-                "is_simple_query": {
-                    "type": "boolean",
-                    "description": "是否为简单查询模式，简单查询会使用更保守的关键词数量和结果数量配置",
-                    "default": False
-                }
-            },
-            "required": ["query"]
-        }
+        parameters=_WEB_SEARCH_PARAMETERS,
     )
     # 默认元数据：较长超时、适度并发、有限重试、启用缓存
     meta = ToolMetadata(
         timeout_s=600.0, 
         max_retries=1, 
         max_concurrency=4,
-        cache_enabled=False  # 简化系统，暂时禁用缓存
+        cache_enabled=False,  # 简化系统，暂时禁用缓存
+        idempotent=True,  # 相同查询的并发调用合并，避免重复的搜索与爬取
     )
     tool_registry.register_tool(web_search_schema, web_search, metadata=meta)
 
 
+# 是否已完成工具注册：重复注册会重建限流器，并重复导入工具模块
+_REGISTERED = False
+
+
 # 注册所有工具
 def register_all_tools():
-    """注册所有可用工具"""
+    """注册所有可用工具（幂等，只在首次调用时注册）"""
+    global _REGISTERED
+    if _REGISTERED:
+        return
     register_web_search_tool()
+    _REGISTERED = True
 
 
 # 注意：工具注册将在 orchestrator 初始化时执行，避免循环导入
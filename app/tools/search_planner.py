@@ -1,7 +1,6 @@
 """
 搜索规划器 - 统一搜索关键词生成和优化
 """
-import re
 from typing import List, Dict, Any, Set, Optional
 from ..config import (
     WEB_SEARCH_MAX_QUERIES, 
@@ -11,6 +10,7 @@ from ..config import (
     SIMPLE_QUERY_MAX_QUERIES,
     SIMPLE_QUERY_MAX_WORDS_PER_QUERY
 )
+from ..utils.search_keywords import QUESTION_PARTICLE_RE
 
 
 class SearchPlanner:
@@ -121,7 +121,7 @@ class SearchPlanner:
             优化后的搜索关键词列表
         """
         # 移除问号和语气词
-        cleaned_question = re.sub(r'[？?吗呢啊]', '', question)
+        cleaned_question = QUESTION_PARTICLE_RE.sub('', question)
         
         # 简化的关键词生成，不使用硬编码模式
         keywords = [cleaned_question]
@@ -2,7 +2,7 @@
 import json
 import httpx
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, AsyncGenerator, Union
+from typing import Dict, List, Any, Optional, AsyncGenerator, Union, Callable, Awaitable
 from ..models import ToolCall, ToolResult, Step, StepType, ToolExecutionContext
 from ..registry import tool_registry
 from ..parsers import ToolCallValidator
@@ -15,6 +15,8 @@ class BaseStrategy(ABC):
     def __init__(self, llm_service_url: str):
         self.llm_service_url = llm_service_url
         self._http_client: Optional[httpx.AsyncClient] = None
+        # 工具执行入口：由 orchestrator 注入（带结果缓存），未注入时直接走注册表
+        self.tool_executor: Optional[Callable[[ToolCall, ToolExecutionContext], Awaitable[ToolResult]]] = None
         # 简化日志系统
     
     async def get_http_client(self) -> httpx.AsyncClient:
@@ -224,6 +226,12 @@ class BaseStrategy(ABC):
             return validation_error
         
         # 执行工具
+        return await self.execute_tool(tool_call, context)
+    
+    async def execute_tool(self, tool_call: ToolCall, context: ToolExecutionContext) -> ToolResult:
+        """执行工具调用（优先使用 orchestrator 注入的执行入口）"""
+        if self.tool_executor is not None:
+            return await self.tool_executor(tool_call, context)
         return await tool_registry.execute_tool(tool_call, context)
     
     def create_observation_step(self, tool_call: ToolCall, tool_result: ToolResult, format_content: bool = True) -> Step:
@@ -380,7 +380,7 @@ class HarmonyStrategy(BaseStrategy):
                                                         current_channel_content = ""
                                                         continue
                                             print(f"[Harmony Stream] 开始执行工具: {tool_call.name}")
-                                            tool_result = await tool_registry.execute_tool(tool_call, context)
+                                            tool_result = await self.execute_tool(tool_call, context)
                                             print(f"[Harmony Stream] 工具执行完成: 成功={tool_result.success}")
                                             
                                             yield {
@@ -391,6 +391,7 @@ class HarmonyStrategy(BaseStrategy):
                                                 "success": tool_result.success,
                                                 "latency_ms": tool_result.latency_ms,
                                                 "retries": tool_result.retries,
+                                                "cache_hit": tool_result.cache_hit,
                                             }
                                             
                                             # 添加步骤到上下文
@@ -469,7 +470,7 @@ class HarmonyStrategy(BaseStrategy):
                                                         in_tool_block = False
                                                         current_tool_content = ""
                                                         continue
-                                            tool_result = await tool_registry.execute_tool(tool_call, context)
+                                            tool_result = await self.execute_tool(tool_call, context)
                                             
                                             yield {
                                                 "type": "tool_result",
@@ -479,6 +480,7 @@ class HarmonyStrategy(BaseStrategy):
                                                 "success": tool_result.success,
                                                 "latency_ms": tool_result.latency_ms,
                                                 "retries": tool_result.retries,
+                                                "cache_hit": tool_result.cache_hit,
                                             }
                                             
                                             # 添加步骤到上下文
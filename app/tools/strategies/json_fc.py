@@ -1,4 +1,5 @@
 """JSON Function Calling 策略实现"""
+import sys
 import json
 from typing import Dict, List, Any, Optional, AsyncGenerator
 from .base import BaseStrategy
@@ -146,7 +147,7 @@ class JSONFunctionCallingStrategy(BaseStrategy):
                 arguments = {}
             
             return ToolCall(
-                name=function_data.get("name", ""),
+                name=sys.intern(function_data.get("name", "")),
                 arguments=arguments,
                 call_id=tool_call_data.get("id")
             ), None
@@ -258,7 +259,7 @@ class JSONFunctionCallingStrategy(BaseStrategy):
                             arguments = {}
                         
                         tool_call = ToolCall(
-                            name=tool_call_data["function"]["name"],
+                            name=sys.intern(tool_call_data["function"]["name"]),
                             arguments=arguments,
                             call_id=tool_call_data["id"]
                         )
@@ -271,7 +272,7 @@ class JSONFunctionCallingStrategy(BaseStrategy):
                         
                         # 执行工具
                         if tool_registry.is_allowed(tool_call.name):
-                            tool_result = await tool_registry.execute_tool(tool_call, context)
+                            tool_result = await self.execute_tool(tool_call, context)
                             
                             yield {
                                 "type": "observation",
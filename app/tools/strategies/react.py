@@ -240,7 +240,7 @@ class ReActStrategy(BaseStrategy):
                             }
                             
                             # 执行工具
-                            tool_result = await tool_registry.execute_tool(tool_call, context)
+                            tool_result = await self.execute_tool(tool_call, context)
                             
                             yield {
                                 "type": "observation",
@@ -249,6 +249,7 @@ class ReActStrategy(BaseStrategy):
                                 "success": tool_result.success,
                                 "latency_ms": tool_result.latency_ms,
                                 "retries": tool_result.retries,
+                                "cache_hit": tool_result.cache_hit,
                             }
                             
                             # 添加步骤到上下文
@@ -0,0 +1,31 @@
+"""
+异步超时工具
+
+Python 3.11+ 使用 asyncio.timeout / asyncio.timeout_at 直接在当前任务上计时（不额外创建 Task）；
+更早的版本回退到 asyncio.wait_for。超时时统一抛出 asyncio.TimeoutError。
+"""
+
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+if hasattr(asyncio, "timeout"):
+    async def await_with_timeout(aw: Awaitable[T], timeout_s: Optional[float]) -> T:
+        """等待 aw 完成，超过 timeout_s 秒时抛出 asyncio.TimeoutError；timeout_s 为 None 表示不限时"""
+        async with asyncio.timeout(timeout_s):
+            return await aw
+
+    async def await_until(aw: Awaitable[T], deadline: float) -> T:
+        """等待 aw 完成，超过事件循环时间 deadline 时抛出 asyncio.TimeoutError"""
+        async with asyncio.timeout_at(deadline):
+            return await aw
+else:
+    async def await_with_timeout(aw: Awaitable[T], timeout_s: Optional[float]) -> T:
+        """等待 aw 完成，超过 timeout_s 秒时抛出 asyncio.TimeoutError；timeout_s 为 None 表示不限时"""
+        return await asyncio.wait_for(aw, timeout=timeout_s)
+
+    async def await_until(aw: Awaitable[T], deadline: float) -> T:
+        """等待 aw 完成，超过事件循环时间 deadline 时抛出 asyncio.TimeoutError"""
+        remaining = deadline - asyncio.get_running_loop().time()
+        return await asyncio.wait_for(aw, timeout=max(0.0, remaining))
@@ -0,0 +1,87 @@
+"""
+LLM 输出 JSON 的清理与截断修复工具
+
+LLM 响应可能因 max_tokens 等原因在中途截断，这里补全未闭合的字符串与括号，
+供问题拆解、思考引擎等模块在 JSON 解析失败时复用。
+"""
+
+import re
+import json
+from typing import List, Optional, Tuple
+
+# 优先 orjson（其 JSONDecodeError 继承自 json.JSONDecodeError / ValueError），未安装时回退到标准库
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# JSON 结构扫描：字符串整体跳过（可能截断于末尾），只逐个访问括号与逗号
+_JSON_STRUCT_RE = re.compile(r'"(?:[^"\\]|\\.)*("|\Z)|[\[\]{},]', re.S)
+
+
+def strip_code_fence(content: str) -> str:
+    """去除 LLM 返回内容首尾的 markdown 代码块标记（```json / ```）及空白"""
+    return content.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+
+
+def close_truncated_json(text: str) -> Tuple[str, int]:
+    """
+    补全被截断的 JSON：闭合未结束的字符串，去掉悬空的逗号/冒号，并按嵌套顺序补齐括号。
+    
+    Returns:
+        (补全后的文本, 最后一个位于字符串外的逗号位置；没有则为 -1)
+    """
+    stack: List[str] = []
+    last_comma = -1
+    unterminated = False
+    for m in _JSON_STRUCT_RE.finditer(text):
+        ch = text[m.start()]
+        if ch == '"':
+            unterminated = m.group(1) == ""
+        elif ch == ",":
+            last_comma = m.start()
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif stack:
+            stack.pop()
+    
+    result = text + '"' if unterminated else text
+    result = result.rstrip().rstrip(",").rstrip()
+    if result.endswith(":"):
+        result += " null"
+    return result + "".join(reversed(stack)), last_comma
+
+
+def repair_truncated_json(content: str) -> Optional[str]:
+    """
+    修复已去除代码围栏的截断 JSON 文本
+    
+    先直接补全未闭合的字符串和括号；仍无法解析时，丢弃最后一个不完整的元素再补全。
+    以 } 结尾的内容不视为截断，无需修复。
+    
+    Returns:
+        修复后的 JSON 字符串（不保证一定可解析）；内容为空或无需修复时返回 None
+    """
+    content = content.strip()
+    if not content or content.endswith('}'):
+        return None
+    
+    # 末尾孤立的转义符无法补全，直接去掉
+    content = content.rstrip('\\')
+    repaired, last_comma = close_truncated_json(content)
+    try:
+        _json_loads(repaired)
+        return repaired
+    except ValueError:
+        pass
+    
+    # 截断在键名或值中间时，回退到最后一个完整元素
+    if last_comma > 0:
+        truncated, _ = close_truncated_json(content[:last_comma])
+        try:
+            _json_loads(truncated)
+            return truncated
+        except ValueError:
+            pass
+    
+    return repaired
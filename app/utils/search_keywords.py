@@ -0,0 +1,10 @@
+"""
+搜索关键词生成的公共文本规则
+
+供搜索规划器与思考引擎在由问题生成搜索关键词时复用。
+"""
+
+import re
+
+# 生成搜索关键词时去除的问号与语气词
+QUESTION_PARTICLE_RE = re.compile(r'[？?吗呢啊]')
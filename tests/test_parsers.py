@@ -0,0 +1,221 @@
+"""
+工具调用解析与参数校验的单元测试
+
+覆盖 ReAct / Harmony 解析器的行为（含按文本缓存）、JSON Schema 校验的错误信息、
+参数清理规则以及工具参数摘要。运行：python -m pytest -q tests
+"""
+
+import pytest
+
+from app.tools.parsers import HarmonyParser, ReActParser, ToolCallValidator, _parse_harmony, _parse_react
+from app.tools.registry import _WEB_SEARCH_PARAMETERS, args_digest
+
+
+@pytest.fixture(autouse=True)
+def clear_parse_caches():
+    """每个用例前清空解析缓存，避免用例之间相互影响命中统计"""
+    _parse_react.cache_clear()
+    _parse_harmony.cache_clear()
+    yield
+
+
+REACT_TOOL_CALL = (
+    "Thought: 需要查询最新信息\n"
+    "Action: web_search\n"
+    'Action Input: {"query": "上海天气"}\n'
+    "Observation: 晴"
+)
+
+
+# ReAct 解析
+
+def test_react_parses_tool_call():
+    tool_call = ReActParser.parse_tool_call(REACT_TOOL_CALL)
+    assert tool_call.name == "web_search"
+    assert tool_call.arguments == {"query": "上海天气"}
+    assert ReActParser.extract_thought(REACT_TOOL_CALL) == "需要查询最新信息"
+    assert ReActParser.extract_action_input(REACT_TOOL_CALL) == {"query": "上海天气"}
+    assert not ReActParser.is_final_answer(REACT_TOOL_CALL)
+
+
+def test_react_thought_stops_at_observation():
+    # 行扫描后 Thought 在任意标签行处结束（旧正则只在 Action / Final Answer 处结束）
+    text = "Thought: 先看结果\nObservation: 无结果\nAction: web_search"
+    assert ReActParser.extract_thought(text) == "先看结果"
+
+
+def test_react_action_at_end_of_text():
+    # 文本末尾没有换行的 Action 也能识别（旧正则要求其后还有换行）
+    text = "Thought: 需要搜索\nAction: web_search"
+    assert ReActParser.extract_action(text) == "web_search"
+    tool_call = ReActParser.parse_tool_call(text)
+    assert tool_call.name == "web_search"
+    assert tool_call.arguments == {}
+
+
+def test_react_multiline_action_input_and_first_occurrence():
+    text = (
+        "Thought: t\n"
+        "Action: web_search\n"
+        "Action Input: {\n"
+        '  "query": "q"\n'
+        "}\n"
+        "Action: other_tool"
+    )
+    # 多行输入完整保留；重复出现的字段只取第一次
+    assert ReActParser.extract_action_input(text) == {"query": "q"}
+    assert ReActParser.extract_action(text) == "web_search"
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"query": "q"}', {"query": "q"}),
+    ('query=q, filter_list="a"', {"query": "q", "filter_list": "a"}),
+    ("随便的文本", {"input": "随便的文本"}),
+])
+def test_react_action_input_formats(raw, expected):
+    text = f"Action: web_search\nAction Input: {raw}"
+    assert ReActParser.extract_action_input(text) == expected
+
+
+def test_react_final_answer_keeps_everything_after_label():
+    text = "Thought: 已经足够\nFinal Answer: 第一行\n第二行"
+    assert ReActParser.is_final_answer(text)
+    assert ReActParser.extract_final_answer(text) == "第一行\n第二行"
+    assert ReActParser.parse_tool_call(text) is None
+
+
+def test_react_parse_cache_is_shared_and_copy_safe():
+    ReActParser.extract_thought(REACT_TOOL_CALL)
+    ReActParser.extract_action(REACT_TOOL_CALL)
+    ReActParser.parse_tool_call(REACT_TOOL_CALL)
+    info = _parse_react.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+
+    # parse 返回副本，修改它不会污染缓存
+    parsed = ReActParser.parse(REACT_TOOL_CALL)
+    parsed["action"] = "changed"
+    assert ReActParser.extract_action(REACT_TOOL_CALL) == "web_search"
+
+
+# Harmony 解析
+
+def test_harmony_xml_tool_with_alias_and_whitelist():
+    text = '<tool name="search">{"query": "q", "topn": 3}</tool>'
+    tool_calls = HarmonyParser.parse_tool_calls(text)
+    assert [(c.name, c.arguments) for c in tool_calls] == [("web_search", {"query": "q"})]
+
+
+def test_harmony_channel_commentary_preferred_over_xml():
+    text = (
+        '<|channel|>commentary to=web_search <|constrain|>json<|message|>{"query": "a", "source": "news"}\n'
+        '<tool name="web_search">{"query": "b"}</tool>'
+    )
+    tool_calls = HarmonyParser.parse_tool_calls(text)
+    assert [(c.name, c.arguments) for c in tool_calls] == [("web_search", {"query": "a"})]
+
+
+def test_harmony_code_fence_and_plain_text():
+    fenced = '```\n<tool name="web_search">{"query": "q"}</tool>\n```'
+    assert HarmonyParser.parse_tool_calls(fenced)[0].arguments == {"query": "q"}
+    assert HarmonyParser.parse_tool_calls("普通回答，没有工具调用") == []
+    assert HarmonyParser.parse_tool_calls("") == []
+
+
+def test_harmony_has_tool_calls_requires_parsable_call():
+    # has_tool_calls 与 parse_tool_calls 结果一致：标记存在但 JSON 无法解析时不算工具调用
+    assert not HarmonyParser.has_tool_calls('<|channel|>commentary to=web_search<|message|>{bad json}')
+    # name 前后带其他属性的标签也能识别
+    assert HarmonyParser.has_tool_calls('<tool name="web_search" id="1">{"query": "q"}</tool>')
+    assert not HarmonyParser.has_tool_calls("没有工具")
+
+
+def test_harmony_cache_returns_fresh_tool_calls():
+    text = '<tool name="web_search">{"query": "q"}</tool>'
+    first = HarmonyParser.parse_tool_calls(text)
+    first[0].arguments["query"] = "changed"
+    second = HarmonyParser.parse_tool_calls(text)
+    assert second[0].arguments == {"query": "q"}
+    assert HarmonyParser.has_tool_calls(text)
+    info = _parse_harmony.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+
+
+# 参数校验
+
+@pytest.mark.parametrize("arguments, expected", [
+    ({}, "缺少必需字段: query"),
+    ({"query": 1}, "字段 query 应为字符串类型"),
+    ({"query": "q", "filter_list": "a"}, "字段 filter_list 应为数组类型"),
+    # jsonschema 也校验数组元素（旧的手写校验不检查元素）
+    ({"query": "q", "filter_list": [1]}, "字段 filter_list.0 应为字符串类型"),
+])
+def test_validate_json_schema_errors(arguments, expected):
+    assert ToolCallValidator.validate_json_schema(arguments, _WEB_SEARCH_PARAMETERS) == (False, expected)
+
+
+def test_validate_json_schema_accepts_valid_arguments():
+    arguments = {"query": "q", "filter_list": ["a.com"], "is_simple_query": True}
+    assert ToolCallValidator.validate_json_schema(arguments, _WEB_SEARCH_PARAMETERS) == (True, None)
+
+
+def test_validate_json_schema_nested_and_enum_messages():
+    schema = {
+        "type": "object",
+        "properties": {
+            "options": {"type": "object", "required": ["lang"]},
+            "mode": {"enum": ["fast", "deep"]},
+            "value": {"type": ["string", "null"]},
+        },
+    }
+    validate = ToolCallValidator.validate_json_schema
+    assert validate({"options": {}}, schema) == (False, "缺少必需字段: options.lang")
+    assert validate({"mode": "slow"}, schema) == (False, "字段 mode 应为以下取值之一: fast, deep")
+    assert validate({"value": 1}, schema) == (False, "字段 value 应为字符串或空值类型")
+
+
+# 参数清理
+
+@pytest.mark.parametrize("value, expected", [
+    ("42", 42),
+    ("1.5", 1.5),
+    ("-1.5", -1.5),
+    (" True ", True),
+    ("false", False),
+    # 负号与首尾空白的整数字符串保持原样，避免 query 等字符串参数被转换
+    ("-5", "-5"),
+    (" 42 ", " 42 "),
+    ("2024年", "2024年"),
+])
+def test_sanitize_arguments_scalar_coercion(value, expected):
+    assert ToolCallValidator.sanitize_arguments({"query": value}) == {"query": expected}
+
+
+def test_sanitize_arguments_lists_and_none():
+    cleaned = ToolCallValidator.sanitize_arguments({
+        "filter_list": "a.com, b.com,",
+        "query": "a,b",
+        "model": None,
+        "is_simple_query": True,
+    })
+    assert cleaned == {"filter_list": ["a.com", "b.com"], "query": "a,b", "is_simple_query": True}
+
+
+def test_sanitized_numeric_query_still_validates():
+    cleaned = ToolCallValidator.sanitize_arguments({"query": "-1"})
+    assert ToolCallValidator.validate_json_schema(cleaned, _WEB_SEARCH_PARAMETERS) == (True, None)
+
+
+# 参数摘要
+
+def test_args_digest_is_key_order_independent():
+    assert args_digest({"a": 1, "b": [1, 2]}) == args_digest({"b": [1, 2], "a": 1})
+    assert args_digest({"a": 1}) != args_digest({"a": 2})
+    assert len(args_digest({})) == 32
+
+
+def test_args_digest_handles_integers_wider_than_64_bits():
+    digest = args_digest({"n": 2 ** 70})
+    assert digest == args_digest({"n": 2 ** 70})
+    assert digest != args_digest({"n": 2 ** 70 + 1})